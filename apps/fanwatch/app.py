@@ -14,7 +14,14 @@ Run:
 No pip installs. Designed for python:3.12-slim.
 
 Env vars (read at startup):
-    ILO_TARGETS        comma list "LABEL=host,LABEL=host" (required)
+    ILO_TARGETS        comma list "LABEL=host,LABEL=host" (required unless
+                       TARGETS_FILE is set or DISCOVER_CIDRS finds the BMCs)
+    TARGETS_FILE       file of LABEL=host entries (comma or newline separated,
+                       "#" comments), e.g. a mounted ConfigMap; replaces
+                       ILO_TARGETS and is re-read every TARGETS_RELOAD_SECONDS
+                       (default 10). Changes apply in place: new targets start,
+                       removed ones stop, unchanged ones keep their pollers,
+                       connections and history.
     ILO_USER           iLO username (default "Administrator")
     ILO_PASS           shared iLO password
     ILO_PASS_<LABEL>   per-host password override (e.g. ILO_PASS_DL360)
@@ -22,18 +29,86 @@ Env vars (read at startup):
     POLL_SECONDS       thermal poll cadence (default 12)
     IML_POLL_SECONDS   IML event-log poll cadence (default 180)
     HISTORY_POINTS     samples kept per target (default 480 ~= 1.6h at 12s)
-
-Abnormal fan-ramp events are persisted to /data/events.jsonl and degrade to
-in-memory only if /data is not writable.
+    DATA_DIR           event persistence directory (default /data)
+    FETCH_RESOURCES    Redfish resources fetched each poll cycle, back to back
+                       on one keep-alive connection (default "thermal,power")
+    HEDGE_REQUESTS     "1" to hedge slow poll GETs with a second request once
+                       the first passes that host's p95 latency (default off)
+
+Sharding (scale polling across replicas, e.g. a StatefulSet):
+    SHARD_COUNT        split ILO_TARGETS across this many replicas (default 1)
+    SHARD_INDEX        this replica's shard; defaults to the ordinal suffix of
+                       HOSTNAME ("fanwatch-2" -> 2)
+    AGGREGATE_SHARDS   comma list of shard base URLs; when set this process
+                       polls nothing and serves the merged dashboard/API
+
+Discovery (hot-adds BMCs found on the network to the poll loop):
+    DISCOVER_CIDRS     comma list of CIDRs to scan, each optionally with a port
+                       ("192.168.1.0/24,10.0.5.0/26:8443"; default port 443)
+    DISCOVER_SECONDS   rescan interval (default 3600; 0 = scan once at startup)
+    DISCOVER_WORKERS   concurrent probes (default 64)
+A discovered BMC is labelled by its serial number and only polled by the shard
+that owns that label. /api/discovery shows the last scan.
+
+Request timeouts adapt per host: 3x the host's p99 latency, clamped to
+[TIMEOUT_FLOOR, HTTP_TIMEOUT], once enough samples exist.
+
+Optional Redfish event push (replaces fast IML polling when enabled):
+    EVENT_DESTINATION  URL the BMCs POST events to, e.g.
+                       https://fanwatch.lan:8443/redfish/events (enables push)
+    EVENT_PORT         local event listener port (default 8443)
+    EVENT_TLS_CERT     PEM cert for the listener (iLO only delivers to https)
+    EVENT_TLS_KEY      PEM key for the listener; plain HTTP if either is unset
+    IML_RECONCILE_SECONDS  IML poll cadence while subscribed (default 1800)
+
+/api/state/<label> and /api/summary return only maxfan, top driver, watts and
+the active-event flag per target (a few hundred bytes each), for widgets and
+alert rules that poll often.
+
+/api/state carries at most SPARK_POINTS history points per target, LTTB-
+downsampled. /api/history/<label>?points=N&from=TS&to=TS returns the
+downsampled history of one target for charting.
+
+Bulk export, streamed with chunked transfer encoding (?from=TS&to=TS&label=L):
+    /api/export/history.ndjson   one {label, host, t, maxfan[, watts]} per line
+    /api/export/events.csv       ramp events overlapping the time range
+
+Responses are gzip-compressed when the client sends Accept-Encoding: gzip. The
+dashboard page is compressed once at startup and served with a content-hash
+ETag per encoding; JSON payloads of GZIP_MIN_BYTES or more are compressed per
+request.
+
+The full IML of every BMC is kept in $DATA_DIR/iml/<label>.jsonl. It is
+backfilled once, page by page, the first time a BMC is seen; after that each
+poll fetches only new entries. POST /api/iml/<label>/backfill walks the whole
+log again. GET /api/iml/<label>?severity=S&from=TS&to=TS&limit=N queries it,
+newest first.
+
+Abnormal fan-ramp events are persisted to $DATA_DIR/events.jsonl and degrade
+to in-memory only if the directory is not writable. The same file holds
+"precursor" events: a single sensor reading far above its own EWMA baseline
+(z-score), often before the fans react.
 """
 
 import base64
+import bisect
+import concurrent.futures
+import csv
+import datetime
+import gzip
+import hashlib
+import http.client
+import io
+import ipaddress
 import json
 import os
+import queue
+import socket
 import ssl
 import threading
 import time
 import urllib.error
+import urllib.parse
 import urllib.request
 from collections import deque
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
@@ -55,19 +130,102 @@ def _parse_targets(raw):
     return targets
 
 
+def _read_targets_file(path):
+    with open(path) as f:
+        return _parse_targets(",".join(line.split("#", 1)[0] for line in f))
+
+
+def _initial_targets(path, raw):
+    if path:
+        try:
+            return _read_targets_file(path)
+        except OSError as e:
+            print("fanwatch: cannot read TARGETS_FILE (%s), using ILO_TARGETS" % e, flush=True)
+    return _parse_targets(raw)
+
+
+def _shard_index(raw, hostname):
+    if raw:
+        return int(raw)
+    tail = hostname.rsplit("-", 1)[-1]
+    return int(tail) if tail.isdigit() else 0
+
+
+SHARD_VNODES = 64             # ring points per shard (smooths the split)
+
+
+def _hash64(key):
+    return int.from_bytes(hashlib.sha1(key.encode("utf-8")).digest()[:8], "big")
+
+
+def _build_ring(count):
+    """Consistent-hash ring as (sorted point hashes, owning shard per point)."""
+    points = sorted((_hash64("shard-%d-%d" % (i, v)), i)
+                    for i in range(count) for v in range(SHARD_VNODES))
+    return [p[0] for p in points], [p[1] for p in points]
+
+
+def _shard_for(label, ring):
+    keys, owners = ring
+    return owners[bisect.bisect(keys, _hash64(label)) % len(keys)]
+
+
+def _shard_targets(targets, count, index):
+    """The targets this replica polls. Labels, not hosts, are hashed so a BMC
+    re-IP keeps its shard; growing SHARD_COUNT moves ~1/count of targets."""
+    if count <= 1:
+        return list(targets)
+    ring = _build_ring(count)
+    return [(l, h) for l, h in targets if _shard_for(l, ring) == index]
+
+
 ILO_USER = os.environ.get("ILO_USER", "Administrator")
 ILO_PASS = os.environ.get("ILO_PASS", "")
 PORT = int(os.environ.get("PORT", "8080"))
 POLL_SECONDS = int(os.environ.get("POLL_SECONDS", "12"))
 IML_POLL_SECONDS = int(os.environ.get("IML_POLL_SECONDS", "180"))
 HISTORY_POINTS = int(os.environ.get("HISTORY_POINTS", "480"))
-TARGETS = _parse_targets(os.environ.get("ILO_TARGETS", ""))
+EVENT_DESTINATION = os.environ.get("EVENT_DESTINATION", "")
+EVENT_PORT = int(os.environ.get("EVENT_PORT", "8443"))
+EVENT_TLS_CERT = os.environ.get("EVENT_TLS_CERT", "")
+EVENT_TLS_KEY = os.environ.get("EVENT_TLS_KEY", "")
+IML_RECONCILE_SECONDS = int(os.environ.get("IML_RECONCILE_SECONDS", "1800"))
+FETCH_RESOURCES = os.environ.get("FETCH_RESOURCES", "thermal,power")
+HEDGE_REQUESTS = os.environ.get("HEDGE_REQUESTS", "0").lower() in ("1", "true", "yes")
+SHARD_COUNT = int(os.environ.get("SHARD_COUNT", "1"))
+SHARD_INDEX = _shard_index(os.environ.get("SHARD_INDEX", ""), os.environ.get("HOSTNAME", ""))
+AGGREGATE_SHARDS = [u.strip().rstrip("/") for u in
+                    os.environ.get("AGGREGATE_SHARDS", "").split(",") if u.strip()]
+TARGETS_FILE = os.environ.get("TARGETS_FILE", "")
+TARGETS_RELOAD_SECONDS = int(os.environ.get("TARGETS_RELOAD_SECONDS", "10"))
+ALL_TARGETS = _initial_targets(TARGETS_FILE, os.environ.get("ILO_TARGETS", ""))
+TARGETS = [] if AGGREGATE_SHARDS else _shard_targets(ALL_TARGETS, SHARD_COUNT, SHARD_INDEX)
+DISCOVER_CIDRS = [c.strip() for c in os.environ.get("DISCOVER_CIDRS", "").split(",")
+                  if c.strip()]
+DISCOVER_SECONDS = int(os.environ.get("DISCOVER_SECONDS", "3600"))
+DISCOVER_WORKERS = int(os.environ.get("DISCOVER_WORKERS", "64"))
 
 DRIVER_THRESHOLD = 0.6        # score above this = "likely driver"
-IML_FETCH_COUNT = 15          # only fetch the last N IML members
-IML_SLEEP = 0.3               # polite delay between member fetches
-HTTP_TIMEOUT = 10
+IML_FETCH_COUNT = 15          # IML entries shown per target (and re-checked
+                              # by each incremental poll)
+IML_SLEEP = 0.3               # polite delay after every IML request (per BMC)
+IML_PAGE = 50                 # members requested per IML collection page
+IML_QUERY_LIMIT = 1000        # most entries /api/iml/<label> returns
+HTTP_TIMEOUT = 10             # ceiling; per-host timeouts adapt below it
 MAX_RETRIES = 3
+TIMEOUT_FLOOR = 2.0           # adaptive timeouts never go below this
+TIMEOUT_P99_MULT = 3.0        # adaptive timeout = p99 latency * this
+LATENCY_WINDOW = 200          # recent requests kept per host for percentiles
+LATENCY_MIN_SAMPLES = 20      # below this, use HTTP_TIMEOUT and never hedge
+HEDGE_FRACTION = 0.05         # hedge budget: at most ~this share of requests
+EVENT_RESUBSCRIBE_SECONDS = 600   # re-check the BMC still has our subscription
+EVENT_MAX_BYTES = 262144          # largest event POST body we read
+EVENT_TYPES = ["Alert", "StatusChange", "ResourceUpdated",
+               "ResourceAdded", "ResourceRemoved"]
+GZIP_MIN_BYTES = 1024         # compress dynamic responses at least this big
+DISCOVER_CONNECT_TIMEOUT = 1.0    # TCP connect per probed address
+DISCOVER_READ_TIMEOUT = 5.0       # TLS + service root / Systems/1 reads
+DISCOVER_MAX_HOSTS = 4096         # refuse CIDRs bigger than this (e.g. a /8 typo)
 
 # Abnormal fan-ramp detection
 BASELINE_WINDOW_S = 600       # ~10 min rolling window for baseline
@@ -79,11 +237,35 @@ RAMP_CLEAR_DELTA = 8          # episode ends below baseline + this ...
 RAMP_CLEAR_SAMPLES = 2        # ... for this many consecutive samples
 MAX_EVENTS = 200              # keep at most this many ramp events
 
-DATA_DIR = "/data"
+# Per-sensor precursor detection: streaming EWMA mean/variance per sensor
+ANOMALY_ALPHA = 0.05          # EWMA weight per poll (~20-sample memory)
+ANOMALY_SLOW_ALPHA = 0.005    # weight while anomalous, so a lasting shift is
+                              # absorbed slowly instead of hiding the onset
+ANOMALY_WARMUP = 30           # samples before a sensor may raise a precursor
+ANOMALY_Z = 4.0               # precursor when z >= this ...
+ANOMALY_MIN_DELTA_C = 3       # ... and the reading is this many C above mean
+ANOMALY_MIN_SD = 0.5          # sd floor: integer readings often have var 0
+ANOMALY_CLEAR_Z = 1.5         # ends below this z for RAMP_CLEAR_SAMPLES polls
+
+SPARK_POINTS = 120            # history points per target in /api/state
+EXPORT_CHUNK_BYTES = 16384    # flush streamed exports in chunks of ~this size
+
+DATA_DIR = os.environ.get("DATA_DIR", "/data")
 EVENTS_FILE = os.path.join(DATA_DIR, "events.jsonl")
 
 _SSL_CTX = ssl._create_unverified_context()
 
+# Per-cycle Redfish resources. Thermal (fans + temperatures) is always fetched;
+# the others are optional and a failure there does not mark the host offline.
+RESOURCES = {
+    "thermal": "/redfish/v1/Chassis/1/Thermal/",
+    "power": "/redfish/v1/Chassis/1/Power/",
+}
+CYCLE_RESOURCES = ["thermal"] + [
+    r for r in (x.strip().lower() for x in FETCH_RESOURCES.split(","))
+    if r in RESOURCES and r != "thermal"
+]
+
 
 def _pass_for(label):
     return os.environ.get("ILO_PASS_" + label, ILO_PASS)
@@ -98,12 +280,16 @@ _lock = threading.Lock()
 # state[label] = {
 #   host, online, maxfan, fans, drivers, temps, events,
 #   history (deque), last_thermal_ok, last_iml_ok,
-#   active_event (event dict or None), below_count (int)
+#   active_event (event dict or None), below_count (int),
+#   push (bool: event subscription live), last_push,
+#   power ({watts, psus} or None),
+#   summary (pre-encoded /api/state/<label> JSON, see _update_summary),
+#   sensor_stats ({sensor name: [ewma mean, ewma var, n, precursor ev, below]}),
+#   model, serial (set for discovered targets)
 # }
-_state = {}
-for _label, _host in TARGETS:
-    _state[_label] = {
-        "host": _host,
+def _new_state(host):
+    return {
+        "host": host,
         "online": False,
         "maxfan": 0,
         "fans": [],
@@ -115,9 +301,22 @@ for _label, _host in TARGETS:
         "last_iml_ok": 0,
         "active_event": None,
         "below_count": 0,
+        "push": False,
+        "last_push": 0,
+        "power": None,
+        "summary": None,
+        "sensor_stats": {},
+        "model": None,
+        "serial": None,
     }
 
-# Abnormal fan-ramp events, newest appended at end. Guarded by _lock.
+
+_state = {}
+for _label, _host in TARGETS:
+    _state[_label] = _new_state(_host)
+
+# Abnormal fan-ramp and sensor precursor events, newest appended at end.
+# Guarded by _lock.
 _events = []
 _event_seq = 0
 _persist_ok = True
@@ -127,18 +326,221 @@ _persist_ok = True
 # Redfish HTTP
 # --------------------------------------------------------------------------- #
 
-def _redfish_get(host, path, label):
-    """GET a Redfish resource. Returns parsed JSON or raises."""
+class _Latency:
+    """Rolling per-host request latencies: percentiles, an adaptive timeout and
+    a token bucket that caps how often requests may be hedged."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = deque(maxlen=LATENCY_WINDOW)
+        self.tokens = 1.0
+
+    def record(self, seconds):
+        with self.lock:
+            self.samples.append(seconds)
+            self.tokens = min(2.0, self.tokens + HEDGE_FRACTION)
+
+    def percentile(self, p):
+        with self.lock:
+            s = sorted(self.samples)
+        if len(s) < LATENCY_MIN_SAMPLES:
+            return None
+        return s[min(len(s) - 1, int(p * len(s)))]
+
+    def timeout(self):
+        p99 = self.percentile(0.99)
+        if p99 is None:
+            return HTTP_TIMEOUT
+        return max(TIMEOUT_FLOOR, min(HTTP_TIMEOUT, p99 * TIMEOUT_P99_MULT))
+
+    def hedge_delay(self):
+        """Seconds to wait before hedging, or None if hedging is off."""
+        return self.percentile(0.95) if HEDGE_REQUESTS else None
+
+    def take_hedge(self):
+        with self.lock:
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return True
+            return False
+
+    def summary(self):
+        out = {}
+        for name, p in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+            v = self.percentile(p)
+            out[name] = round(v, 3) if v is not None else None
+        out["timeout"] = round(self.timeout(), 2)
+        return out
+
+
+_latency = {}
+
+
+def _latency_for(label):
+    lat = _latency.get(label)
+    if lat is None:
+        lat = _latency.setdefault(label, _Latency())
+    return lat
+
+
+def _redfish_request(host, path, label, method="GET", body=None):
+    """Send a Redfish request. Returns (status, headers, parsed JSON or None)
+    or raises (urllib.error.HTTPError for 4xx/5xx)."""
     url = "https://%s%s" % (host, path)
     auth = base64.b64encode(
         ("%s:%s" % (ILO_USER, _pass_for(label))).encode("utf-8")
     ).decode("ascii")
-    req = urllib.request.Request(url)
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    req = urllib.request.Request(url, data=data, method=method)
     req.add_header("Authorization", "Basic " + auth)
     req.add_header("Accept", "application/json")
-    with urllib.request.urlopen(req, timeout=HTTP_TIMEOUT, context=_SSL_CTX) as resp:
-        data = resp.read()
-    return json.loads(data.decode("utf-8", "replace"))
+    if data is not None:
+        req.add_header("Content-Type", "application/json")
+    lat = _latency_for(label)
+    t0 = time.monotonic()
+    try:
+        with urllib.request.urlopen(req, timeout=lat.timeout(), context=_SSL_CTX) as resp:
+            raw = resp.read()
+            status, headers = resp.status, resp.headers
+    finally:
+        lat.record(time.monotonic() - t0)
+    doc = json.loads(raw.decode("utf-8", "replace")) if raw.strip() else None
+    return status, headers, doc
+
+
+def _redfish_get(host, path, label):
+    """GET a Redfish resource. Returns parsed JSON or raises."""
+    return _redfish_request(host, path, label)[2]
+
+
+class _RedfishConn:
+    """One keep-alive HTTPS connection to a BMC, owned by a single poller
+    thread. Reconnects transparently when the BMC drops it. GETs use the
+    host's adaptive timeout and, with HEDGE_REQUESTS, are raced against a
+    second request on a fresh connection once they pass the host's p95."""
+
+    def __init__(self, host, label):
+        self.host = host
+        self.label = label
+        self.conn = None
+        self.lat = _latency_for(label)
+        self.auth = "Basic " + base64.b64encode(
+            ("%s:%s" % (ILO_USER, _pass_for(label))).encode("utf-8")
+        ).decode("ascii")
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:  # noqa: BLE001
+                pass
+            self.conn = None
+
+    def _exchange(self, conn, path, timeout):
+        """One GET on `conn`, latency recorded. Returns (status, data,
+        reusable); closes `conn` and raises on transport errors."""
+        t0 = time.monotonic()
+        try:
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            conn.request("GET", path, headers={
+                "Authorization": self.auth,
+                "Accept": "application/json",
+                "Connection": "keep-alive",
+            })
+            resp = conn.getresponse()
+            data = resp.read()
+            return resp.status, data, not resp.will_close
+        except Exception:
+            conn.close()
+            raise
+        finally:
+            self.lat.record(time.monotonic() - t0)
+
+    def _get_once(self, path):
+        timeout = self.lat.timeout()
+        conn = self.conn or http.client.HTTPSConnection(
+            self.host, timeout=timeout, context=_SSL_CTX)
+        self.conn = None  # owned by this request until it completes cleanly
+        delay = self.lat.hedge_delay()
+        if delay is None or delay >= timeout:
+            status, data, reusable = self._exchange(conn, path, timeout)
+        else:
+            conn, (status, data, reusable) = self._hedged(conn, path, timeout, delay)
+        if reusable:
+            self.conn = conn
+        else:
+            conn.close()
+        if status >= 400:
+            raise RuntimeError("HTTP %d for %s" % (status, path))
+        return json.loads(data.decode("utf-8", "replace"))
+
+    def _hedged(self, conn, path, timeout, delay):
+        """Run the GET on `conn`; if it has not answered after `delay` and the
+        hedge budget allows, race a copy on a new connection. Returns
+        (winning conn, exchange result). Losers are closed when they finish."""
+        results = queue.Queue()
+
+        def run(c):
+            try:
+                results.put((c, self._exchange(c, path, timeout), None))
+            except Exception as exc:  # noqa: BLE001
+                results.put((c, None, exc))
+
+        threading.Thread(target=run, args=(conn,), daemon=True).start()
+        pending = 1
+        try:
+            first = results.get(timeout=delay)
+        except queue.Empty:
+            first = None
+            if self.lat.take_hedge():
+                fresh = http.client.HTTPSConnection(self.host, timeout=timeout,
+                                                    context=_SSL_CTX)
+                threading.Thread(target=run, args=(fresh,), daemon=True).start()
+                pending += 1
+        last_exc = None
+        while pending:
+            c, res, exc = first if first is not None else results.get()
+            first = None
+            pending -= 1
+            if exc is None:
+                if pending:
+                    threading.Thread(target=self._reap, args=(results, pending),
+                                     daemon=True).start()
+                return c, res
+            last_exc = exc
+        raise last_exc
+
+    @staticmethod
+    def _reap(results, n):
+        for _ in range(n):
+            c, _res, _exc = results.get()
+            c.close()
+
+    def get(self, path, retries=MAX_RETRIES):
+        last = None
+        for attempt in range(retries):
+            try:
+                return self._get_once(path)
+            except Exception as exc:  # noqa: BLE001 - never crash the poller
+                last = exc
+                self.close()
+                time.sleep(0.5 * (attempt + 1))
+        raise last if last else RuntimeError("redfish get failed")
+
+    def fetch_cycle(self, names):
+        """GET each named resource back to back. The first (thermal) must
+        succeed; later ones come back as None on failure."""
+        out = {}
+        for i, name in enumerate(names):
+            try:
+                out[name] = self.get(RESOURCES[name])
+            except Exception:  # noqa: BLE001
+                if i == 0:
+                    raise
+                out[name] = None
+        return out
 
 
 def _redfish_get_retry(host, path, label, retries=MAX_RETRIES):
@@ -193,6 +595,37 @@ def _parse_thermal(doc):
     return maxfan, fans, temps
 
 
+def _watts(val):
+    try:
+        return int(round(float(val)))
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_power(doc):
+    """Return {watts, psus} from a Power document, or None if it has neither."""
+    if not doc:
+        return None
+    watts = None
+    for pc in doc.get("PowerControl", []) or []:
+        watts = _watts(pc.get("PowerConsumedWatts"))
+        if watts is not None:
+            break
+    psus = []
+    for ps in doc.get("PowerSupplies", []) or []:
+        psus.append({
+            "name": ps.get("Name", "?"),
+            "watts": _watts(ps.get("LastPowerOutputWatts")),
+            "state": (ps.get("Status") or {}).get("State", "Unknown"),
+        })
+    if watts is None:
+        outs = [p["watts"] for p in psus if p["watts"] is not None]
+        watts = sum(outs) if outs else None
+    if watts is None and not psus:
+        return None
+    return {"watts": watts, "psus": psus}
+
+
 def _is_hd_max(name):
     return "hd max" in (name or "").lower()
 
@@ -268,13 +701,14 @@ def _suspected_driver(scored):
     return None
 
 
-def _capture_snapshot(ev, fans, temps, iml_events):
+def _capture_snapshot(ev, fans, temps, iml_events, power=None):
     """Fill/refresh the at-peak diagnostic snapshot on an event."""
     scored = _score_all_sensors(temps)
     ev["fans_at_peak"] = list(fans)
     ev["sensors_at_peak"] = scored
     ev["suspected_driver"] = _suspected_driver(scored)
     ev["iml_at_peak"] = list(iml_events)
+    ev["power_at_peak"] = power
 
 
 def _driver_str(d):
@@ -344,7 +778,7 @@ def _events_init():
     print("fanwatch ramp-events: loaded %d, %s" % (len(_events), mode), flush=True)
 
 
-def _detect_ramp(label, host, now, maxfan, fans, temps):
+def _detect_ramp(label, host, now, maxfan, fans, temps, power=None):
     """Per-poll abnormal-ramp detection + episode debounce. Lock held by
     caller. Called BEFORE the current sample is appended to history so the
     baseline window excludes it."""
@@ -365,6 +799,7 @@ def _detect_ramp(label, host, now, maxfan, fans, temps):
             _event_seq += 1
             ev = {
                 "id": _event_seq,
+                "kind": "ramp",
                 "server": label,
                 "host": host,
                 "start_ts": int(now),
@@ -376,8 +811,9 @@ def _detect_ramp(label, host, now, maxfan, fans, temps):
                 "suspected_driver": None,
                 "sensors_at_peak": [],
                 "iml_at_peak": [],
+                "power_at_peak": None,
             }
-            _capture_snapshot(ev, fans, temps, st["events"])
+            _capture_snapshot(ev, fans, temps, st["events"], power)
             st["active_event"] = ev
             st["below_count"] = 0
             _events.append(ev)
@@ -391,7 +827,7 @@ def _detect_ramp(label, host, now, maxfan, fans, temps):
     # episode active: refresh snapshot on a new peak
     if maxfan > ev["peak_maxfan"]:
         ev["peak_maxfan"] = maxfan
-        _capture_snapshot(ev, fans, temps, st["events"])
+        _capture_snapshot(ev, fans, temps, st["events"], power)
     ev["duration_s"] = int(now - ev["start_ts"])
 
     if maxfan < ev["baseline"] + RAMP_CLEAR_DELTA:
@@ -412,33 +848,467 @@ def _detect_ramp(label, host, now, maxfan, fans, temps):
         _events_save()
 
 
+# --------------------------------------------------------------------------- #
+# Per-sensor precursor detection (EWMA z-score)
+# --------------------------------------------------------------------------- #
+
+def _open_precursor(label, host, now, t, mean, z, maxfan, fans, temps, power):
+    """Start a precursor event for sensor t. Lock held by caller."""
+    global _event_seq
+    st = _state[label]
+    _event_seq += 1
+    ev = {
+        "id": _event_seq,
+        "kind": "precursor",
+        "server": label,
+        "host": host,
+        "start_ts": int(now),
+        "end_ts": None,
+        "duration_s": 0,
+        "sensor": t["name"],
+        "baseline_c": round(mean, 1),
+        "peak_c": t["c"],
+        "z": round(z, 1),
+        # fan columns as for ramp events: maxfan at onset and at the sensor peak
+        "baseline": maxfan,
+        "peak_maxfan": maxfan,
+    }
+    _precursor_snapshot(ev, t, fans, temps, st["events"], power)
+    _events.append(ev)
+    _events_trim()
+    _events_save()
+    print("PRECURSOR start server=%s sensor=%s c=%s mean=%.1f z=%.1f maxfan=%d%%"
+          % (label, t["name"], t["c"], mean, z, maxfan), flush=True)
+    return ev
+
+
+def _precursor_snapshot(ev, t, fans, temps, iml_events, power):
+    _capture_snapshot(ev, fans, temps, iml_events, power)
+    crit = t["crit"]
+    ev["suspected_driver"] = {
+        "name": t["name"], "c": t["c"], "crit": crit,
+        "score": round(t["c"] / float(crit), 3) if crit else None,
+        "note": "z=%.1f" % ev["z"],
+    }
+
+
+def _detect_anomalies(label, host, now, maxfan, fans, temps, power=None):
+    """Per-sensor streaming z-score, O(1) per sensor per poll. Each Enabled
+    sensor keeps an EWMA mean and variance of its own readings. The host-wide
+    shift (median deviation across sensors) is subtracted first, so a load
+    change that warms every sensor is not flagged; one sensor that still reads
+    ANOMALY_Z sd (and ANOMALY_MIN_DELTA_C) above its mean opens a precursor
+    event - a single sensor heating up before the fans react - persisted with
+    the ramp events. Lock held by caller."""
+    st = _state[label]
+    stats = st["sensor_stats"]
+    live = []
+    for t in temps:
+        c = t["c"]
+        if c is None or t["state"] != "Enabled" or _is_hd_max(t["name"]):
+            continue
+        s = stats.get(t["name"])
+        if s is None:
+            stats[t["name"]] = [float(c), 0.0, 1, None, 0]
+            continue
+        live.append((t, s, c - s[0]))
+    shift = _median([d for _t, _s, d in live]) if len(live) >= 3 else 0
+
+    for t, s, d in live:
+        mean, var, n, ev, below = s
+        z = (d - shift) / max(var ** 0.5, ANOMALY_MIN_SD)
+        hot = (n >= ANOMALY_WARMUP and z >= ANOMALY_Z
+               and d - shift >= ANOMALY_MIN_DELTA_C)
+        a = ANOMALY_SLOW_ALPHA if hot or (ev is not None and z >= ANOMALY_CLEAR_Z) \
+            else ANOMALY_ALPHA
+        s[0] = mean + a * d
+        s[1] = (1 - a) * (var + a * (d - shift) ** 2)
+        s[2] = n + 1
+
+        if ev is None:
+            if hot:
+                s[3] = _open_precursor(label, host, now, t, mean, z, maxfan, fans,
+                                       temps, power)
+                s[4] = 0
+            continue
+
+        ev["duration_s"] = int(now - ev["start_ts"])
+        if t["c"] > ev["peak_c"]:
+            ev["peak_c"] = t["c"]
+            ev["z"] = max(ev["z"], round(z, 1))
+            ev["peak_maxfan"] = maxfan
+            _precursor_snapshot(ev, t, fans, temps, st["events"], power)
+            _events_save()
+        s[4] = below + 1 if z < ANOMALY_CLEAR_Z else 0
+        if s[4] >= RAMP_CLEAR_SAMPLES:
+            ev["end_ts"] = int(now)
+            s[3], s[4] = None, 0
+            _events_save()
+            print("PRECURSOR end   server=%s sensor=%s peak=%sC z=%.1f duration=%ds"
+                  % (label, ev["sensor"], ev["peak_c"], ev["z"], ev["duration_s"]),
+                  flush=True)
+
+
+def _active_precursors(st):
+    """[{sensor, c, z}] for st's open precursor events. Lock held by caller."""
+    return [{"sensor": s[3]["sensor"], "c": s[3]["peak_c"], "z": s[3]["z"]}
+            for s in st["sensor_stats"].values() if s[3] is not None]
+
+
+# --------------------------------------------------------------------------- #
+# Per-target summaries (widgets, alert rules)
+# --------------------------------------------------------------------------- #
+
+def _update_summary(label):
+    """Re-encode label's summary. Lock held by caller; the thermal poller calls
+    this once per cycle so /api/state/<label> and /api/summary only copy
+    strings instead of walking sensors and history."""
+    st = _state[label]
+    top = st["drivers"][0] if st["drivers"] else None
+    ev = st["active_event"]
+    power = st["power"]
+    st["summary"] = json.dumps({
+        "label": label,
+        "host": st["host"],
+        "online": st["online"],
+        "maxfan": st["maxfan"],
+        "driver": {"name": top["name"], "c": top["c"], "crit": top["crit"]} if top else None,
+        "active_event": ev is not None,
+        "precursors": [p["sensor"] for p in _active_precursors(st)],
+        "event_start": ev["start_ts"] if ev else None,
+        "event_peak": ev["peak_maxfan"] if ev else None,
+        "watts": power["watts"] if power else None,
+        "updated": int(st["last_thermal_ok"]),
+    }, separators=(",", ":"))
+
+
+def _summary_json(label):
+    """One target's summary JSON, or None for an unknown label."""
+    with _lock:
+        st = _state.get(label)
+        if st is None:
+            return None
+        if st["summary"] is None:
+            _update_summary(label)
+        return st["summary"]
+
+
+def _summaries_json():
+    """{"ts": ..., "targets": {label: summary}} assembled from the cached
+    per-target strings."""
+    with _lock:
+        for label, st in _state.items():
+            if st["summary"] is None:
+                _update_summary(label)
+        parts = ["%s:%s" % (json.dumps(l), st["summary"]) for l, st in _state.items()]
+    return '{"ts":%d,"targets":{%s}}' % (int(time.time()), ",".join(parts))
+
+
+# --------------------------------------------------------------------------- #
+# IML history store (one-time paginated backfill, then incremental)
+# --------------------------------------------------------------------------- #
+
+IML_PATH = "/redfish/v1/Systems/1/LogServices/IML/Entries/"
+IML_DIR = os.path.join(DATA_DIR, "iml")
+
+
+def _iso_ts(value):
+    """Unix seconds of a Redfish timestamp, 0 if it does not parse."""
+    try:
+        return int(datetime.datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp())
+    except (AttributeError, ValueError):
+        return 0
+
+
+class _ImlStore:
+    """Full IML history of one BMC: append-only $DATA_DIR/iml/<label>.jsonl
+    plus in-memory indexes by time and by severity. Filled by the target's
+    IML poller thread, queried from HTTP threads.
+
+    Member URIs restart at 1 when a BMC's log is cleared, so they only dedupe
+    within a log generation (meta["gen"]); older entries are kept."""
+
+    def __init__(self, label):
+        safe = "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in label)
+        self.path = os.path.join(IML_DIR, safe + ".jsonl")
+        self.meta_path = os.path.join(IML_DIR, safe + ".meta.json")
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.times, self.entries = [], []   # parallel, sorted by ts
+        self.by_sev = {}                    # lower-case severity -> ([ts], [entry])
+        self.uris = set()                   # member URIs stored this generation
+        self.pending = []                   # lines not yet appended to the file
+        self.meta = {"gen": 0, "count": 0, "backfill_ts": 0}
+        self.backfill = {"running": False, "requested": False, "fetched": 0}
+        if _persist_ok:
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.meta_path) as f:
+                self.meta.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        self._index(json.loads(line))
+                    except (ValueError, KeyError):
+                        pass
+        except OSError:
+            pass
+
+    def _index(self, rec):
+        i = bisect.bisect_right(self.times, rec["ts"])
+        self.times.insert(i, rec["ts"])
+        self.entries.insert(i, rec)
+        times, entries = self.by_sev.setdefault(rec["severity"].lower(), ([], []))
+        i = bisect.bisect_right(times, rec["ts"])
+        times.insert(i, rec["ts"])
+        entries.insert(i, rec)
+        if rec.get("gen", 0) == self.meta["gen"]:
+            self.uris.add(rec["id"])
+
+    def known(self, uri):
+        with self.lock:
+            return uri in self.uris
+
+    def add(self, uri, doc):
+        """Store one IML member document. False if already stored."""
+        rec = _parse_iml_entry(doc)
+        rec.update(id=uri, ts=_iso_ts(rec["created"]), gen=self.meta["gen"])
+        with self.lock:
+            if uri in self.uris:
+                return False
+            self._index(rec)
+            self.pending.append(json.dumps(rec) + "\n")
+        return True
+
+    def new_generation(self):
+        with self.lock:
+            self.meta["gen"] += 1
+            self.uris = set()
+
+    def new_host(self):
+        """The label now points at a different BMC: its member URIs and count
+        say nothing about the old one's, so start a generation and backfill
+        from scratch. Stored entries are kept."""
+        self.new_generation()
+        self.flush(count=0, backfill_ts=0)
+
+    def flush(self, **meta):
+        """Append pending entries and rewrite the meta file. In-memory only
+        if persistence is unavailable."""
+        with self.lock:
+            lines, self.pending = self.pending, []
+            self.meta.update(meta)
+            doc = dict(self.meta)
+        if not _persist_ok:
+            return
+        try:
+            os.makedirs(IML_DIR, exist_ok=True)
+            if lines:
+                with open(self.path, "a") as f:
+                    f.writelines(lines)
+            tmp = self.meta_path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(doc, f)
+            os.replace(tmp, self.meta_path)
+        except OSError:
+            pass
+
+    def newest(self, n):
+        """Last n entries, newest first, in the dashboard's {created,
+        severity, message} form."""
+        with self.lock:
+            tail = self.entries[-n:]
+        return [{"created": e["created"], "severity": e["severity"],
+                 "message": e["message"]} for e in reversed(tail)]
+
+    def query(self, severity=None, t_from=None, t_to=None, limit=100):
+        """(newest-first entries, number matched) for a severity/time range."""
+        with self.lock:
+            if severity:
+                times, entries = self.by_sev.get(severity.lower(), ([], []))
+            else:
+                times, entries = self.times, self.entries
+            lo = bisect.bisect_left(times, t_from) if t_from is not None else 0
+            hi = bisect.bisect_right(times, t_to) if t_to is not None else len(times)
+            return entries[max(lo, hi - limit):hi][::-1], max(0, hi - lo)
+
+    def status(self):
+        with self.lock:
+            return {"stored": len(self.entries), "bmc_count": self.meta["count"],
+                    "backfill_ts": self.meta["backfill_ts"], **self.backfill}
+
+
+_iml_stores = {}
+_iml_stores_lock = threading.Lock()
+
+
+def _iml_store_for(label):
+    with _iml_stores_lock:
+        store = _iml_stores.get(label)
+        if store is None:
+            store = _iml_stores[label] = _ImlStore(label)
+    return store
+
+
+def _iml_publish(label, store):
+    events = store.newest(IML_FETCH_COUNT)
+    with _lock:
+        st = _state.get(label)
+        if st is not None:
+            st["events"] = events
+
+
+def _iml_page_path(skip):
+    return "%s?$skip=%d&$top=%d" % (IML_PATH, skip, IML_PAGE)
+
+
+def _iml_walk(label, host, store, skip, stop, backfill=False):
+    """Walk the IML Entries collection from member `skip` to the end, a page
+    at a time (Members@odata.nextLink, else $skip/$top), storing each member
+    not seen before as soon as it is fetched. IML_SLEEP follows every
+    request, which caps the request rate per BMC. Returns the collection's
+    member count."""
+    path, total = _iml_page_path(skip), None
+    while path and not stop.is_set():
+        page = _redfish_get_retry(host, path, label)
+        time.sleep(IML_SLEEP)
+        members = page.get("Members") or []
+        total = page.get("Members@odata.count", total)
+        link = page.get("Members@odata.nextLink")
+        if len(members) > IML_PAGE:
+            # paging not honoured: the whole collection came back at once
+            link = None
+            if total is None or skip + len(members) > total:
+                members = members[skip:]
+            total = skip + len(members)
+        for m in members:
+            uri = m.get("@odata.id")
+            if not uri or store.known(uri):
+                continue
+            try:
+                doc = m if "Created" in m else _redfish_get_retry(host, uri, label, retries=2)
+            except Exception:  # noqa: BLE001 - picked up by a later walk
+                continue
+            if doc is not m:
+                time.sleep(IML_SLEEP)
+            if stop.is_set():
+                break
+            if store.add(uri, doc) and backfill:
+                store.backfill["fetched"] += 1
+        store.flush()
+        _iml_publish(label, store)
+        skip += len(members)
+        if link:
+            parts = urllib.parse.urlsplit(link)
+            path = parts.path + ("?" + parts.query if parts.query else "")
+        elif members and total is not None and skip < total:
+            path = _iml_page_path(skip)
+        else:
+            path = None
+    return skip if total is None else total
+
+
+def _iml_backfill(label, host, store, stop):
+    store.backfill.update(running=True, requested=False, fetched=0)
+    print("IML backfill start server=%s" % label, flush=True)
+    try:
+        total = _iml_walk(label, host, store, 0, stop, backfill=True)
+        if stop.is_set():
+            return
+        store.flush(count=total, backfill_ts=int(time.time()))
+    finally:
+        store.backfill["running"] = False
+    print("IML backfill done  server=%s fetched=%d bmc_count=%d"
+          % (label, store.backfill["fetched"], total), flush=True)
+
+
+def _iml_incremental(label, host, store, stop):
+    """Fetch members past the last known count, re-checking the last
+    IML_FETCH_COUNT so late-arriving entries are not missed."""
+    known = store.meta["count"]
+    total = _iml_walk(label, host, store, max(0, known - IML_FETCH_COUNT), stop)
+    if stop.is_set():
+        return
+    if total < known:
+        # log cleared on the BMC: member URIs restart at 1
+        store.new_generation()
+        total = _iml_walk(label, host, store, 0, stop)
+    store.flush(count=total)
+
+
+def _iml_snapshot(label, query):
+    """/api/iml/<label> body, or None for an unknown label; raises ValueError
+    on bad query args."""
+    with _lock:
+        if label not in _state:
+            return None
+    q = urllib.parse.parse_qs(query)
+    t_from, t_to = _time_range(q)
+    limit = max(1, min(int(q.get("limit", ["100"])[0]), IML_QUERY_LIMIT))
+    store = _iml_store_for(label)
+    entries, matched = store.query(q.get("severity", [""])[0] or None, t_from, t_to, limit)
+    return {"label": label, "matched": matched, "store": store.status(),
+            "entries": entries}
+
+
+def _iml_request_backfill(label):
+    with _lock:
+        if label not in _state:
+            return False
+    store = _iml_store_for(label)
+    store.backfill["requested"] = True
+    store.wake.set()
+    return True
+
+
 # --------------------------------------------------------------------------- #
 # Pollers
 # --------------------------------------------------------------------------- #
 
-def _thermal_poller(label, host):
-    path = "/redfish/v1/Chassis/1/Thermal/"
-    while True:
+def _thermal_poller(label, host, stop):
+    """Per-host poll cycle: CYCLE_RESOURCES fetched back to back over one
+    persistent connection, stamped with a single timestamp. Runs until `stop`
+    is set (target removed or moved to another host)."""
+    conn = _RedfishConn(host, label)
+    while not stop.is_set():
         try:
-            doc = _redfish_get_retry(host, path, label)
-            maxfan, fans, temps = _parse_thermal(doc)
-            drivers = _compute_drivers(temps)
+            docs = conn.fetch_cycle(CYCLE_RESOURCES)
             now = time.time()
+            maxfan, fans, temps = _parse_thermal(docs["thermal"])
+            drivers = _compute_drivers(temps)
+            power = _parse_power(docs.get("power"))
             with _lock:
+                if stop.is_set():
+                    break
                 st = _state[label]
                 st["online"] = True
                 st["maxfan"] = maxfan
                 st["fans"] = fans
                 st["temps"] = temps
                 st["drivers"] = drivers
+                st["power"] = power
                 st["last_thermal_ok"] = now
+                _detect_anomalies(label, host, now, maxfan, fans, temps, power)
                 # detect ramp using history BEFORE appending current sample
-                _detect_ramp(label, host, now, maxfan, fans, temps)
-                st["history"].append({"t": int(now), "maxfan": maxfan})
+                _detect_ramp(label, host, now, maxfan, fans, temps, power)
+                sample = {"t": int(now), "maxfan": maxfan}
+                if power and power["watts"] is not None:
+                    sample["watts"] = power["watts"]
+                st["history"].append(sample)
+                _update_summary(label)
         except Exception:  # noqa: BLE001
             with _lock:
+                if stop.is_set():
+                    break
                 _state[label]["online"] = False
-        time.sleep(POLL_SECONDS)
+                _update_summary(label)
+        stop.wait(POLL_SECONDS)
+    conn.close()
 
 
 def _parse_iml_entry(doc):
@@ -449,43 +1319,523 @@ def _parse_iml_entry(doc):
     }
 
 
-def _iml_poller(label, host):
-    index_path = "/redfish/v1/Systems/1/LogServices/IML/Entries/"
-    while True:
+def _iml_poller(label, host, stop):
+    """Backfill the BMC's whole IML once (or when asked), then poll only for
+    new entries. Sleeps on the store's wake event so a backfill request, a
+    pushed event or `stop` is picked up at once."""
+    store = _iml_store_for(label)
+    _iml_publish(label, store)
+    while not stop.is_set():
         try:
-            index = _redfish_get_retry(host, index_path, label)
-            members = index.get("Members", []) or []
-            urls = []
-            for m in members:
-                u = m.get("@odata.id")
-                if u:
-                    urls.append(u)
-            # last N references only
-            urls = urls[-IML_FETCH_COUNT:]
-            events = []
-            for u in urls:
-                try:
-                    entry = _redfish_get_retry(host, u, label, retries=2)
-                    events.append(_parse_iml_entry(entry))
-                except Exception:  # noqa: BLE001
-                    pass
-                time.sleep(IML_SLEEP)
-            # newest first
-            events.reverse()
+            if not store.meta["backfill_ts"] or store.backfill["requested"]:
+                _iml_backfill(label, host, store, stop)
+            else:
+                _iml_incremental(label, host, store, stop)
             with _lock:
-                _state[label]["events"] = events
+                if stop.is_set():
+                    break
                 _state[label]["last_iml_ok"] = time.time()
         except Exception:  # noqa: BLE001
             pass  # keep last-known events
-        time.sleep(IML_POLL_SECONDS)
+        # with a live event subscription this is only a reconciliation pass
+        with _lock:
+            st = _state.get(label)
+            push = st is not None and st["push"]
+        store.wake.wait(IML_RECONCILE_SECONDS if push else IML_POLL_SECONDS)
+        store.wake.clear()
+
+
+# Stop events of running pollers, per target label. Guarded by _lock.
+_stops = {}
+
+
+def _start_target(label, host):
+    stop = threading.Event()
+    with _lock:
+        _stops[label] = stop
+    threading.Thread(target=_thermal_poller, args=(label, host, stop),
+                     daemon=True, name="thermal-" + label).start()
+    threading.Thread(target=_iml_poller, args=(label, host, stop),
+                     daemon=True, name="iml-" + label).start()
+    if EVENT_DESTINATION:
+        threading.Thread(target=_event_subscriber, args=(label, host, stop),
+                         daemon=True, name="events-" + label).start()
+
+
+def _stop_pollers(label):
+    """Signal label's pollers to exit. They finish an in-flight request but
+    never write state after the signal."""
+    with _lock:
+        stop = _stops.pop(label, None)
+    if stop is not None:
+        stop.set()
+        _iml_store_for(label).wake.set()
 
 
 def _start_pollers():
     for label, host in TARGETS:
-        threading.Thread(target=_thermal_poller, args=(label, host),
-                         daemon=True, name="thermal-" + label).start()
-        threading.Thread(target=_iml_poller, args=(label, host),
-                         daemon=True, name="iml-" + label).start()
+        _start_target(label, host)
+
+
+def _add_target(label, host, model=None, serial=None):
+    """Hot-add a target: create its state and start its pollers. Returns False
+    if the label or host is already polled."""
+    with _lock:
+        if label in _state or any(st["host"] == host for st in _state.values()):
+            return False
+        st = _new_state(host)
+        st["model"], st["serial"] = model, serial
+        _state[label] = st
+        TARGETS.append((label, host))
+    _start_target(label, host)
+    return True
+
+
+def _remove_target(label):
+    """Stop a target's pollers and drop its state. Its IML store and ramp
+    events stay on disk."""
+    _stop_pollers(label)
+    with _lock:
+        _state.pop(label, None)
+        TARGETS[:] = [(l, h) for l, h in TARGETS if l != label]
+    with _iml_stores_lock:
+        _iml_stores.pop(label, None)
+    _latency.pop(label, None)
+
+
+def _move_target(label, host):
+    """Point an existing label at a new host: restart its pollers, keep its
+    history, baselines and events. The IML store starts a new generation so
+    the new BMC's member URIs are not taken for the old one's."""
+    _stop_pollers(label)
+    _iml_store_for(label).new_host()
+    with _lock:
+        st = _state[label]
+        st["host"], st["online"], st["push"] = host, False, False
+        _update_summary(label)
+        TARGETS[:] = [(l, host if l == label else h) for l, h in TARGETS]
+    _latency.pop(label, None)
+    _start_target(label, host)
+
+
+# --------------------------------------------------------------------------- #
+# Target reload (TARGETS_FILE)
+# --------------------------------------------------------------------------- #
+
+# Labels that came from configuration (not discovery); only these are removed
+# when they disappear from TARGETS_FILE.
+_configured = set(l for l, _h in TARGETS)
+
+
+def _reload_targets(all_targets):
+    """Apply a new configured target list in place."""
+    global ALL_TARGETS, _configured
+    ALL_TARGETS = all_targets
+    if AGGREGATE_SHARDS:
+        return
+    want = dict(_shard_targets(all_targets, SHARD_COUNT, SHARD_INDEX))
+    with _lock:
+        have = {l: _state[l]["host"] for l in _configured if l in _state}
+    added, removed, moved = [], [], []
+    for label in have:
+        if label not in want:
+            _remove_target(label)
+            removed.append(label)
+    for label, host in want.items():
+        if label not in have:
+            if _add_target(label, host):
+                added.append(label)
+        elif have[label] != host:
+            _move_target(label, host)
+            moved.append(label)
+    _configured = set(want)
+    print("fanwatch targets reloaded: %d polled, +%d -%d moved %d%s"
+          % (len(want), len(added), len(removed), len(moved),
+             "  (" + " ".join(["+" + l for l in added] + ["-" + l for l in removed]
+                             + ["~" + l for l in moved]) + ")"
+             if added or removed or moved else ""), flush=True)
+
+
+def _targets_watcher():
+    """Re-read TARGETS_FILE and reload when its content changes. ConfigMap
+    volumes are updated by an atomic symlink swap, so the content is compared,
+    not the mtime."""
+    last = None
+    while True:
+        try:
+            with open(TARGETS_FILE, "rb") as f:
+                digest = hashlib.sha1(f.read()).hexdigest()
+            if last is not None and digest != last:
+                _reload_targets(_read_targets_file(TARGETS_FILE))
+            last = digest
+        except OSError:
+            pass  # mid-swap or briefly missing: keep the current targets
+        except Exception as e:  # noqa: BLE001
+            print("fanwatch: targets reload failed: %s" % e, flush=True)
+        time.sleep(TARGETS_RELOAD_SECONDS)
+
+
+# --------------------------------------------------------------------------- #
+# Discovery (DISCOVER_CIDRS): scan subnets for Redfish BMCs
+# --------------------------------------------------------------------------- #
+
+# Last scan, for /api/discovery. Guarded by _lock.
+_discovery = {"ts": 0, "duration_s": None, "scanned": 0, "found": []}
+
+
+def _discover_addrs(specs):
+    """Yield (ip, port) for every host address of "CIDR[:port]" specs."""
+    for spec in specs:
+        cidr, port = spec, 443
+        if spec.count(":") == 1:
+            cidr, port = spec.split(":")
+            port = int(port)
+        try:
+            net = ipaddress.ip_network(cidr, strict=False)
+        except ValueError:
+            print("discovery: bad CIDR %r, skipped" % spec, flush=True)
+            continue
+        if net.num_addresses > DISCOVER_MAX_HOSTS:
+            print("discovery: %s has more than %d addresses, skipped"
+                  % (cidr, DISCOVER_MAX_HOSTS), flush=True)
+            continue
+        for ip in (net.hosts() if net.num_addresses > 1 else [net.network_address]):
+            yield str(ip), port
+
+
+def _probe_get(conn, path, auth=None):
+    headers = {"Accept": "application/json"}
+    if auth:
+        headers["Authorization"] = "Basic " + auth
+    conn.request("GET", path, headers=headers)
+    resp = conn.getresponse()
+    raw = resp.read()
+    if resp.status != 200:
+        return None
+    return json.loads(raw.decode("utf-8", "replace"))
+
+
+def _probe(ip, port):
+    """Identify a Redfish BMC at ip:port: {host, model, serial, manager} or
+    None. Dead addresses cost at most DISCOVER_CONNECT_TIMEOUT."""
+    try:
+        sock = socket.create_connection((ip, port), timeout=DISCOVER_CONNECT_TIMEOUT)
+    except OSError:
+        return None
+    host = ip if port == 443 else "%s:%d" % (ip, port)
+    conn = http.client.HTTPSConnection(ip, port, context=_SSL_CTX)
+    try:
+        sock.settimeout(DISCOVER_READ_TIMEOUT)
+        conn.sock = _SSL_CTX.wrap_socket(sock, server_hostname=ip)
+        root = _probe_get(conn, "/redfish/v1/")  # unauthenticated on iLO
+        if not isinstance(root, dict) or "RedfishVersion" not in root:
+            return None
+        oem = root.get("Oem") or {}
+        mgr = ((oem.get("Hpe") or oem.get("Hp") or {}).get("Manager") or [{}])[0]
+        auth = base64.b64encode(("%s:%s" % (ILO_USER, ILO_PASS)).encode("utf-8")).decode("ascii")
+        system = _probe_get(conn, "/redfish/v1/Systems/1/", auth) or {}
+        return {
+            "host": host,
+            "model": system.get("Model") or root.get("Product"),
+            "serial": (system.get("SerialNumber") or root.get("SerialNumber") or "").strip(),
+            "manager": mgr.get("ManagerType"),
+        }
+    except Exception:  # noqa: BLE001 - not a (working) Redfish service
+        return None
+    finally:
+        conn.close()
+        sock.close()  # no-op once wrapped; frees it if the handshake failed
+
+
+def _discover_once():
+    """Probe every configured address concurrently and hot-add new BMCs that
+    belong to this shard."""
+    t0 = time.monotonic()
+    addrs = list(_discover_addrs(DISCOVER_CIDRS))
+    found = []
+    if addrs:
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=min(DISCOVER_WORKERS, len(addrs)),
+                thread_name_prefix="discover") as pool:
+            found = [b for b in pool.map(lambda a: _probe(*a), addrs) if b]
+    ring = _build_ring(SHARD_COUNT) if SHARD_COUNT > 1 else None
+    new = 0
+    for bmc in found:
+        label = bmc["serial"] or bmc["host"].replace(".", "-").replace(":", "-")
+        bmc["label"] = label
+        bmc["added"] = False
+        if ring is not None and _shard_for(label, ring) != SHARD_INDEX:
+            continue
+        if _add_target(label, bmc["host"], bmc["model"], bmc["serial"] or None):
+            bmc["added"] = True
+            new += 1
+            print("discovery: added %s=%s (%s %s)"
+                  % (label, bmc["host"], bmc["model"], bmc["manager"]), flush=True)
+    elapsed = time.monotonic() - t0
+    with _lock:
+        _discovery.update(ts=int(time.time()), duration_s=round(elapsed, 2),
+                          scanned=len(addrs), found=found)
+    print("discovery: scanned %d address(es) in %.1fs, %d BMC(s), %d new"
+          % (len(addrs), elapsed, len(found), new), flush=True)
+
+
+def _discovery_loop():
+    while True:
+        try:
+            _discover_once()
+        except Exception as e:  # noqa: BLE001
+            print("discovery: scan failed: %s" % e, flush=True)
+        if DISCOVER_SECONDS <= 0:
+            return
+        time.sleep(DISCOVER_SECONDS)
+
+
+def _discovery_snapshot():
+    with _lock:
+        return dict(_discovery, found=list(_discovery["found"]))
+
+
+# --------------------------------------------------------------------------- #
+# Redfish event push (EventService subscriptions)
+# --------------------------------------------------------------------------- #
+
+SUBSCRIPTIONS_PATH = "/redfish/v1/EventService/Subscriptions/"
+
+
+def _event_context(label):
+    return "fanwatch:" + label
+
+
+def _subscribe(host, label):
+    """Drop subscriptions a previous run left for our destination, then
+    register a fresh one. Returns the new subscription's path."""
+    index = _redfish_get_retry(host, SUBSCRIPTIONS_PATH, label)
+    for m in index.get("Members", []) or []:
+        uri = m.get("@odata.id")
+        if not uri:
+            continue
+        try:
+            sub = _redfish_get(host, uri, label)
+            if sub.get("Destination") == EVENT_DESTINATION:
+                _redfish_request(host, uri, label, method="DELETE")
+        except Exception:  # noqa: BLE001 - stale entry, not fatal
+            pass
+    body = {
+        "Destination": EVENT_DESTINATION,
+        "EventTypes": EVENT_TYPES,
+        "Context": _event_context(label),
+        "Protocol": "Redfish",
+    }
+    _, headers, doc = _redfish_request(host, SUBSCRIPTIONS_PATH, label,
+                                       method="POST", body=body)
+    loc = headers.get("Location") or (doc or {}).get("@odata.id")
+    if not loc:
+        raise RuntimeError("subscription created without a Location")
+    return urllib.parse.urlsplit(loc).path
+
+
+def _subscription_alive(host, uri, label):
+    try:
+        _redfish_get(host, uri, label)
+        return True
+    except urllib.error.HTTPError as exc:
+        if exc.code == 404:
+            return False
+        raise
+
+
+def _event_subscriber(label, host, stop):
+    """Keep one EventService subscription registered on the BMC. While it is
+    live the IML poller drops to IML_RECONCILE_SECONDS. The subscription is
+    deleted when the target is stopped."""
+    uri = None
+    while not stop.is_set():
+        try:
+            if uri is None or not _subscription_alive(host, uri, label):
+                uri = _subscribe(host, label)
+                print("fanwatch events: subscribed %s at %s" % (label, uri), flush=True)
+            push = True
+        except Exception:  # noqa: BLE001 - fall back to IML polling
+            uri, push = None, False
+        with _lock:
+            if stop.is_set():
+                break
+            _state[label]["push"] = push
+        stop.wait(EVENT_RESUBSCRIBE_SECONDS)
+    if uri is not None:
+        try:
+            _redfish_request(host, uri, label, method="DELETE")
+        except Exception:  # noqa: BLE001 - the BMC expires it eventually
+            pass
+
+
+def _push_label(doc, peer):
+    """Map an event POST to a target: by our Context, else by source address."""
+    contexts = [doc.get("Context")]
+    contexts += [e.get("Context") for e in doc.get("Events") or [] if isinstance(e, dict)]
+    with _lock:
+        for ctx in contexts:
+            if isinstance(ctx, str) and ctx.startswith("fanwatch:"):
+                label = ctx[len("fanwatch:"):]
+                if label in _state:
+                    return label
+        for label, st in _state.items():
+            if st["host"] == peer:
+                return label
+    return None
+
+
+def _origin_path(ev):
+    origin = ev.get("OriginOfCondition")
+    if isinstance(origin, dict):
+        origin = origin.get("@odata.id")
+    return origin if isinstance(origin, str) else ""
+
+
+def _ingest_push(doc, peer):
+    """Turn a Redfish event payload into IML-style entries and merge them,
+    newest first, into the target's event log."""
+    label = _push_label(doc, peer)
+    if label is None:
+        return
+    with _lock:
+        st = _state.get(label)
+        if st is None:
+            return  # removed since
+        host = st["host"]
+    entries = []
+    for ev in doc.get("Events") or []:
+        if not isinstance(ev, dict):
+            continue
+        entry = None
+        origin = _origin_path(ev)
+        if "/LogServices/IML/Entries/" in origin:
+            try:
+                entry = _parse_iml_entry(_redfish_get_retry(host, origin, label, retries=2))
+            except Exception:  # noqa: BLE001 - fall back to the event text
+                entry = None
+        if entry is None:
+            entry = {
+                "created": ev.get("EventTimestamp", ""),
+                "severity": ev.get("Severity", "OK"),
+                "message": ev.get("Message") or ev.get("MessageId", ""),
+            }
+        entries.append(entry)
+    if not entries:
+        return
+    with _lock:
+        st = _state[label]
+        merged = list(st["events"])
+        seen = {(e["created"], e["message"]) for e in merged}
+        for entry in entries:
+            if (entry["created"], entry["message"]) not in seen:
+                seen.add((entry["created"], entry["message"]))
+                merged.insert(0, entry)
+        st["events"] = merged[:IML_FETCH_COUNT]
+        st["last_push"] = time.time()
+    # let the IML poller store the new entries now rather than at reconcile
+    _iml_store_for(label).wake.set()
+
+
+class EventHandler(BaseHTTPRequestHandler):
+    """Receives Redfish event POSTs from the BMCs."""
+    server_version = "fanwatch-events/1.0"
+
+    def log_message(self, *args):  # quiet
+        pass
+
+    def do_POST(self):
+        try:
+            length = min(int(self.headers.get("Content-Length") or 0), EVENT_MAX_BYTES)
+        except ValueError:
+            length = 0
+        raw = self.rfile.read(length) if length > 0 else b""
+        # ack first: the BMC only needs a 2xx, entry fetches happen after
+        self.send_response(204)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+        try:
+            doc = json.loads(raw.decode("utf-8", "replace"))
+        except ValueError:
+            return
+        if isinstance(doc, dict):
+            try:
+                _ingest_push(doc, self.client_address[0])
+            except Exception:  # noqa: BLE001 - never kill the listener
+                pass
+
+
+def _start_event_listener():
+    """Serve EventHandler on EVENT_PORT, TLS if a cert/key pair is set. On a
+    bad cert, log and leave the IML pollers at their normal cadence."""
+    try:
+        httpd = ThreadingHTTPServer(("0.0.0.0", EVENT_PORT), EventHandler)
+        scheme = "http"
+        if EVENT_TLS_CERT and EVENT_TLS_KEY:
+            ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            ctx.load_cert_chain(EVENT_TLS_CERT, EVENT_TLS_KEY)
+            httpd.socket = ctx.wrap_socket(httpd.socket, server_side=True)
+            scheme = "https"
+    except Exception as exc:  # noqa: BLE001
+        print("fanwatch events: listener disabled (%s)" % exc, flush=True)
+        return False
+    threading.Thread(target=httpd.serve_forever, daemon=True,
+                     name="event-listener").start()
+    print("fanwatch events: %s listener on :%d -> %s"
+          % (scheme, EVENT_PORT, EVENT_DESTINATION), flush=True)
+    return True
+
+
+# --------------------------------------------------------------------------- #
+# History downsampling
+# --------------------------------------------------------------------------- #
+
+def _lttb(data, threshold):
+    """Largest-Triangle-Three-Buckets downsample of [{t, maxfan}] to at most
+    `threshold` points. Keeps first/last and the visually significant peaks."""
+    n = len(data)
+    if threshold >= n:
+        return list(data)
+    if threshold < 3:
+        return [data[0], data[-1]]
+    out = [data[0]]
+    every = (n - 2) / float(threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # average of the next bucket is the third triangle vertex
+        nstart = int((i + 1) * every) + 1
+        nend = min(int((i + 2) * every) + 1, n)
+        span = data[nstart:nend] or data[-1:]
+        avg_t = sum(p["t"] for p in span) / float(len(span))
+        avg_y = sum(p["maxfan"] for p in span) / float(len(span))
+
+        ax, ay = data[a]["t"], data[a]["maxfan"]
+        best, best_area = None, -1.0
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            p = data[j]
+            area = abs((ax - avg_t) * (p["maxfan"] - ay)
+                       - (ax - p["t"]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        out.append(data[best])
+        a = best
+    out.append(data[-1])
+    return out
+
+
+def _history_for(label, t_from=None, t_to=None, points=SPARK_POINTS):
+    """Downsampled history for one target within [t_from, t_to]. None if the
+    label is unknown."""
+    with _lock:
+        st = _state.get(label)
+        if st is None:
+            return None
+        hist = list(st["history"])
+    if t_from is not None or t_to is not None:
+        lo = t_from if t_from is not None else float("-inf")
+        hi = t_to if t_to is not None else float("inf")
+        hist = [h for h in hist if lo <= h["t"] <= hi]
+    return _lttb(hist, points)
 
 
 # --------------------------------------------------------------------------- #
@@ -493,13 +1843,14 @@ def _start_pollers():
 # --------------------------------------------------------------------------- #
 
 def _recent_events_for(label):
-    """Last 5 ramp events for a target, newest first, compact form."""
+    """Last 5 ramp/precursor events for a target, newest first, compact form."""
     matched = [e for e in _events if e.get("server") == label]
     out = []
     for e in reversed(matched[-5:]):
         d = e.get("suspected_driver") or {}
         out.append({
             "id": e.get("id"),
+            "kind": e.get("kind", "ramp"),
             "start_ts": e.get("start_ts"),
             "peak_maxfan": e.get("peak_maxfan"),
             "suspected_driver": d.get("name"),
@@ -518,11 +1869,18 @@ def _snapshot():
                 "fans": list(st["fans"]),
                 "drivers": list(st["drivers"]),
                 "temps": list(st["temps"]),
+                "power": st["power"],
+                "model": st["model"],
+                "latency": _latency_for(label).summary(),
                 "history": list(st["history"]),
                 "events": list(st["events"]),
                 "active_event": st["active_event"] is not None,
+                "precursors": _active_precursors(st),
                 "recent_events": _recent_events_for(label),
             }
+    # Downsample outside the lock so pollers are not blocked behind LTTB
+    for t in out["targets"].values():
+        t["history"] = _lttb(t["history"], SPARK_POINTS)
     return out
 
 
@@ -531,6 +1889,198 @@ def _events_snapshot():
         return {"events": list(reversed(_events))}
 
 
+# --------------------------------------------------------------------------- #
+# Bulk export (streamed row by row)
+# --------------------------------------------------------------------------- #
+
+EVENT_CSV_FIELDS = ["id", "server", "host", "start_ts", "end_ts", "duration_s",
+                    "peak_maxfan", "baseline", "suspected_driver", "driver_c",
+                    "driver_crit", "driver_score", "watts_at_peak", "kind",
+                    "sensor", "z"]
+
+
+def _in_range(t, t_from, t_to):
+    return (t_from is None or t >= t_from) and (t_to is None or t <= t_to)
+
+
+def _iter_history_ndjson(t_from, t_to, labels=None):
+    """Yield one NDJSON line per history sample. Each target's deque is copied
+    on its own, so memory is bounded by HISTORY_POINTS, not the export size."""
+    with _lock:
+        order = [(l, st["host"]) for l, st in _state.items()
+                 if not labels or l in labels]
+    for label, host in order:
+        with _lock:
+            st = _state.get(label)
+            hist = list(st["history"]) if st else []
+        for h in hist:
+            if _in_range(h["t"], t_from, t_to):
+                row = {"label": label, "host": host}
+                row.update(h)
+                yield (json.dumps(row) + "\n").encode("utf-8")
+
+
+def _iter_events_csv(t_from, t_to, labels=None):
+    """Yield a CSV header then one line per event overlapping the range,
+    oldest first."""
+    with _lock:
+        events = list(_events)
+    buf = io.StringIO()
+    w = csv.writer(buf, lineterminator="\n")
+
+    def flush():
+        out = buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate(0)
+        return out
+
+    w.writerow(EVENT_CSV_FIELDS)
+    yield flush()
+    now = int(time.time())
+    for ev in events:
+        if labels and ev.get("server") not in labels:
+            continue
+        start = ev.get("start_ts") or 0
+        end = ev.get("end_ts") if ev.get("end_ts") is not None else now
+        if (t_to is not None and start > t_to) or (t_from is not None and end < t_from):
+            continue
+        d = ev.get("suspected_driver") or {}
+        pw = ev.get("power_at_peak") or {}
+        w.writerow([ev.get("id"), ev.get("server"), ev.get("host"), ev.get("start_ts"),
+                    ev.get("end_ts"), ev.get("duration_s"), ev.get("peak_maxfan"),
+                    ev.get("baseline"), d.get("name"), d.get("c"), d.get("crit"),
+                    d.get("score"), pw.get("watts"), ev.get("kind", "ramp"),
+                    ev.get("sensor"), ev.get("z")])
+        yield flush()
+
+
+# --------------------------------------------------------------------------- #
+# Aggregator (AGGREGATE_SHARDS): merge shard APIs into one dashboard
+# --------------------------------------------------------------------------- #
+
+AGG_TIMEOUT = 5               # per-shard request timeout
+
+_agg_pool = concurrent.futures.ThreadPoolExecutor(
+    max_workers=max(1, min(32, 2 * len(AGGREGATE_SHARDS))), thread_name_prefix="agg")
+_agg_lock = threading.Lock()
+_agg_last = {}                # shard url -> {"ok_ts", "state", "summary", "events"}
+_agg_owner = {}               # target label -> shard url (from the last merge)
+
+
+def _agg_get(url, method="GET"):
+    """GET (or POST) a shard JSON endpoint (gzip accepted). Returns parsed
+    JSON or None."""
+    req = urllib.request.Request(url, method=method, headers={"Accept-Encoding": "gzip"})
+    try:
+        with urllib.request.urlopen(req, timeout=AGG_TIMEOUT) as resp:
+            raw = resp.read()
+            if resp.headers.get("Content-Encoding") == "gzip":
+                raw = gzip.decompress(raw)
+        return json.loads(raw.decode("utf-8", "replace"))
+    except Exception:  # noqa: BLE001 - a shard being down is expected
+        return None
+
+
+def _agg_fan_out(path):
+    """GET `path` from every shard concurrently -> {shard url: doc or None}."""
+    futs = {u: _agg_pool.submit(_agg_get, u + path) for u in AGGREGATE_SHARDS}
+    return {u: f.result() for u, f in futs.items()}
+
+
+def _agg_targets(path, slot):
+    """Merge the per-target maps of a shard endpoint (/api/state or
+    /api/summary). A shard that does not answer contributes its last known
+    targets, forced offline and flagged stale."""
+    results = _agg_fan_out(path)
+    order = {l: i for i, (l, _h) in enumerate(ALL_TARGETS)}
+    out = {"ts": int(time.time()), "targets": {}, "shards": {}}
+    merged = []
+    with _agg_lock:
+        for url in AGGREGATE_SHARDS:
+            doc = results[url]
+            last = _agg_last.setdefault(url, {"ok_ts": 0})
+            if doc is not None:
+                last[slot], last["ok_ts"] = doc, int(time.time())
+                out["shards"][url] = {"ok": True, "last_ok": last["ok_ts"]}
+            else:
+                out["shards"][url] = {"ok": False, "last_ok": last["ok_ts"]}
+            src = doc if doc is not None else last.get(slot)
+            for label, t in ((src or {}).get("targets") or {}).items():
+                if doc is None:
+                    t = dict(t, online=False, stale=True)
+                merged.append((label, t))
+                _agg_owner[label] = url
+    merged.sort(key=lambda lt: (order.get(lt[0], len(order)), lt[0]))
+    for label, t in merged:
+        out["targets"][label] = t
+    return out
+
+
+def _agg_state():
+    return _agg_targets("/api/state", "state")
+
+
+def _agg_summary():
+    return _agg_targets("/api/summary", "summary")
+
+
+def _agg_events():
+    """Merged /api/events, newest first. Ids are prefixed with the shard
+    number so they stay unique across shards."""
+    results = _agg_fan_out("/api/events")
+    events = []
+    with _agg_lock:
+        for i, url in enumerate(AGGREGATE_SHARDS):
+            last = _agg_last.setdefault(url, {"ok_ts": 0})
+            doc = results[url]
+            if doc is not None:
+                last["events"] = doc
+            for e in ((doc or last.get("events") or {}).get("events") or []):
+                events.append(dict(e, id="%d-%s" % (i, e.get("id"))))
+    events.sort(key=lambda e: e.get("start_ts") or 0, reverse=True)
+    return {"events": events}
+
+
+def _agg_proxy(label, path, method="GET"):
+    """Proxy a per-target request (path already carries the quoted label) to
+    the shard that owns label. Returns (status, doc)."""
+    with _agg_lock:
+        url = _agg_owner.get(label)
+    if url is None:
+        _agg_state()
+        with _agg_lock:
+            url = _agg_owner.get(label)
+    if url is None:
+        return 404, {"error": "unknown target"}
+    doc = _agg_get(url + path, method)
+    if doc is None:
+        return 503, {"error": "shard unavailable"}
+    return 200, doc
+
+
+def _iter_agg_export(kind, query):
+    """Concatenate a streamed export from every reachable shard, keeping only
+    the first CSV header."""
+    header_sent = False
+    for url in AGGREGATE_SHARDS:
+        try:
+            resp = urllib.request.urlopen("%s/api/export/%s?%s" % (url, kind, query),
+                                          timeout=AGG_TIMEOUT)
+        except Exception:  # noqa: BLE001 - skip shards that are down
+            continue
+        with resp:
+            if kind.endswith(".csv"):
+                header = resp.readline()
+                if not header_sent:
+                    header_sent = True
+                    yield header
+            while True:
+                chunk = resp.read(EXPORT_CHUNK_BYTES)
+                if not chunk:
+                    break
+                yield chunk
+
+
 # --------------------------------------------------------------------------- #
 # Frontend
 # --------------------------------------------------------------------------- #
@@ -582,6 +2132,7 @@ INDEX_HTML = r"""<!DOCTYPE html>
   .fanrow { display: flex; align-items: flex-end; gap: 14px; margin-bottom: 10px; }
   .bignum { font-size: 40px; font-weight: 700; line-height: 1; font-variant-numeric: tabular-nums; }
   .bignum .pct { font-size: 18px; font-weight: 500; color: var(--muted); margin-left: 2px; }
+  .bignum.watts { font-size: 24px; color: var(--fg); }
   .bignum.green { color: var(--green); } .bignum.amber { color: var(--amber); } .bignum.red { color: var(--red); }
   .spark { flex: 1; height: 42px; }
   .caption { color: var(--muted); font-size: 11px; text-transform: uppercase; letter-spacing: .5px; }
@@ -606,6 +2157,7 @@ INDEX_HTML = r"""<!DOCTYPE html>
     color: var(--muted); white-space: nowrap; }
   .tag.neutral { color: var(--amber); border-color: rgba(227,179,65,.4); }
   .tag.absent { color: var(--grey); }
+  .tag.pre { color: var(--amber); border-color: rgba(227,179,65,.4); margin-right: 4px; }
   .secthead { color: var(--muted); font-size: 11px; text-transform: uppercase;
     letter-spacing: .5px; margin: 16px 0 7px; }
   .events { display: flex; flex-direction: column; gap: 5px; max-height: 220px;
@@ -631,6 +2183,7 @@ INDEX_HTML = r"""<!DOCTYPE html>
   section.evtpanel { margin-top: 26px; }
   section.evtpanel > h2 { font-size: 14px; font-weight: 600; margin: 0 0 4px; }
   section.evtpanel .hint { color: var(--muted); font-size: 12px; margin-bottom: 12px; }
+  .evtlist { max-height: 70vh; overflow-y: auto; }
   .evt { background: var(--panel); border: 1px solid var(--line);
     border-radius: 8px; margin-bottom: 8px; overflow: hidden; }
   .evt > summary { list-style: none; cursor: pointer; display: grid;
@@ -668,7 +2221,7 @@ INDEX_HTML = r"""<!DOCTYPE html>
   <section class="evtpanel">
     <h2>Abnormal fan events</h2>
     <div class="hint">Diagnostic snapshots captured whenever fans ramp above baseline. Click a row to expand.</div>
-    <div id="events-panel"><div class="empty">loading...</div></div>
+    <div id="events-panel" class="evtlist"><div class="empty">loading...</div></div>
   </section>
 </div>
 <script>
@@ -758,37 +2311,80 @@ function eventRows(events){
   }).join("");
 }
 
-function card(label, t){
+// ---- target cards: keyed, patched in place ----
+// One card element per label is kept across ticks. Each card is split into
+// parts whose HTML is compared with what is already in the DOM; only parts that
+// changed are replaced, so an idle target costs string building but no layout.
+var cards = {};
+
+function cardParts(label, t){
   var fc = fanClass(t.maxfan);
-  return '<div class="card">'
-    + '<div class="chead">'
-    +   '<span class="label">'+esc(label)+'</span>'
-    +   '<span class="host">'+esc(t.host)+'</span>'
-    +   (t.active_event ? '<span class="badge-ramp">RAMP ACTIVE</span>' : '')
-    +   '<span class="dot '+(t.online ? "on" : "off")+'"></span>'
-    + '</div>'
-    + '<div class="fanrow">'
-    +   '<div><div class="caption">max fan</div>'
-    +     '<div class="bignum '+fc+'">'+t.maxfan+'<span class="pct">%</span></div></div>'
-    +   sparkline(t.history)
-    + '</div>'
-    + fanbars(t.fans)
-    + bumpingLine(t)
+  return {
+    head: '<span class="label">'+esc(label)+'</span>'
+      + '<span class="host">'+esc(t.host)+'</span>'
+      + (t.active_event ? '<span class="badge-ramp">RAMP ACTIVE</span>' : '')
+      + ((t.precursors && t.precursors.length)
+        ? '<span class="tag pre">PRECURSOR '+esc(t.precursors.map(function(p){ return p.sensor; }).join(", "))+'</span>' : '')
+      + '<span class="dot '+(t.online ? "on" : "off")+'"></span>',
+    fanrow: '<div><div class="caption">max fan</div>'
+      + '<div class="bignum '+fc+'">'+t.maxfan+'<span class="pct">%</span></div></div>'
+      + ((t.power && t.power.watts != null)
+        ? '<div><div class="caption">power</div><div class="bignum watts">'+t.power.watts
+          + '<span class="pct">W</span></div></div>' : '')
+      + sparkline(t.history),
+    bars: fanbars(t.fans),
+    bump: bumpingLine(t),
+    sensors: sensorRows(t.temps),
+    iml: eventRows(t.events)
+  };
+}
+
+function cardShell(){
+  var el = document.createElement("div");
+  el.className = "card";
+  el.innerHTML = '<div class="chead" data-part="head"></div>'
+    + '<div class="fanrow" data-part="fanrow"></div>'
+    + '<div data-part="bars"></div>'
+    + '<div data-part="bump"></div>'
     + '<table class="sensors"><thead><tr>'
     +   '<th>sensor</th><th class="num">read</th><th class="num">crit</th><th>load</th>'
-    + '</tr></thead><tbody>'+sensorRows(t.temps)+'</tbody></table>'
+    + '</tr></thead><tbody data-part="sensors"></tbody></table>'
     + '<div class="secthead">event log (IML)</div>'
-    + '<div class="events">'+eventRows(t.events)+'</div>'
-    + '</div>';
+    + '<div class="events" data-part="iml"></div>';
+  var slots = {};
+  el.querySelectorAll("[data-part]").forEach(function(n){
+    slots[n.getAttribute("data-part")] = n;
+  });
+  return {el: el, slots: slots, html: {}};
+}
+
+function patchCard(c, parts){
+  Object.keys(parts).forEach(function(k){
+    if(c.html[k] !== parts[k]){
+      c.slots[k].innerHTML = parts[k];
+      c.html[k] = parts[k];
+    }
+  });
 }
 
 function render(data){
   var grid = document.getElementById("grid");
   var labels = Object.keys(data.targets);
   if(!labels.length){
-    grid.innerHTML = '<div class="empty">no targets configured - set ILO_TARGETS</div>';
+    cards = {};
+    grid.innerHTML = '<div class="empty">no targets configured - set ILO_TARGETS or TARGETS_FILE</div>';
   } else {
-    grid.innerHTML = labels.map(function(l){ return card(l, data.targets[l]); }).join("");
+    grid.querySelectorAll(":scope > .empty").forEach(function(n){ grid.removeChild(n); });
+    var seen = {};
+    labels.forEach(function(l, i){
+      var c = cards[l] || (cards[l] = cardShell());
+      seen[l] = true;
+      patchCard(c, cardParts(l, data.targets[l]));
+      if(grid.children[i] !== c.el){ grid.insertBefore(c.el, grid.children[i] || null); }
+    });
+    Object.keys(cards).forEach(function(l){
+      if(!seen[l]){ grid.removeChild(cards[l].el); delete cards[l]; }
+    });
   }
   var d = new Date(data.ts*1000);
   document.getElementById("updated").textContent = "updated " + d.toLocaleTimeString();
@@ -830,43 +2426,135 @@ function peakSensorTable(sensors){
     + '<th>sensor</th><th class="num">read</th><th class="num">crit</th>'
     + '<th class="num">score</th><th>load</th></tr></thead><tbody>'+rows+'</tbody></table>';
 }
-function eventBlock(e){
+function eventSummary(e){
   var when = new Date(e.start_ts*1000).toLocaleString();
+  var pre = e.kind === "precursor";
   var peak = e.peak_maxfan;
   var pc = peak > 70 ? "red" : (peak >= 40 ? "amber" : "green");
-  return '<details class="evt" data-id="'+esc(e.id)+'"'+(e.end_ts == null ? ' open' : '')+'>'
-    + '<summary>'
+  return '<summary>'
     +   '<span class="evt-when">'+esc(when)+'</span>'
     +   '<span class="evt-srv">'+esc(e.server)+'</span>'
-    +   '<span class="evt-peak '+pc+'">'+peak+'%</span>'
+    +   (pre ? '<span class="evt-peak amber">'+e.peak_c+'C</span>'
+             : '<span class="evt-peak '+pc+'">'+peak+'%</span>')
     +   '<span class="evt-dur">'+durStr(e)+'</span>'
-    +   '<span class="evt-drv">'+driverLabel(e.suspected_driver)+'</span>'
-    + '</summary>'
-    + '<div class="evt-body">'
-    +   '<div class="secthead">sensors at peak (maxfan '+peak+'%, baseline '+e.baseline+'%)</div>'
+    +   '<span class="evt-drv">'+(pre ? '<span class="tag pre">precursor</span>' : '')
+    +     driverLabel(e.suspected_driver)+'</span>'
+    + '</summary>';
+}
+function eventBody(e){
+  return '<div class="evt-body">'
+    +   (e.kind === "precursor"
+      ? '<div class="secthead">'+esc(e.sensor)+' peaked at '+e.peak_c+'C vs EWMA baseline '
+        + e.baseline_c+'C (z '+e.z+'), maxfan '+e.baseline+'% at onset</div>' : '')
+    +   '<div class="secthead">sensors at peak (maxfan '+e.peak_maxfan+'%, baseline '+e.baseline+'%'
+    +     ((e.power_at_peak && e.power_at_peak.watts != null) ? ', '+e.power_at_peak.watts+' W' : '')+')</div>'
     +   peakSensorTable(e.sensors_at_peak)
     +   '<div class="secthead">IML at peak</div>'
     +   '<div class="events">'+eventRows(e.iml_at_peak)+'</div>'
-    + '</div>'
-    + '</details>';
+    + '</div>';
+}
+
+// The list is virtualized: only rows near the viewport of the scrollable panel
+// exist in the DOM, framed by two spacers sized from measured (or estimated)
+// row heights. A row's body is built when it is opened and dropped on close.
+var EVT_ROW_H = 46;      // estimated height of a collapsed row incl. margin
+var EVT_OVERSCAN = 6;    // extra rows rendered above/below the viewport
+var evt = {list: [], byId: {}, open: {}, heights: {}, rows: {}, box: null, pending: false};
+
+function evtIsOpen(e){
+  var o = evt.open[e.id];
+  return o === undefined ? e.end_ts == null : o;
+}
+function evtHeight(e){ return evt.heights[e.id] || EVT_ROW_H; }
+
+function evtRow(e){
+  var d = document.createElement("details");
+  d.className = "evt";
+  d.setAttribute("data-id", e.id);
+  var row = {el: d, summary: null, id: e.id};
+  d.addEventListener("toggle", function(){
+    var cur = evt.byId[row.id];
+    evt.open[row.id] = d.open;
+    var body = d.querySelector(".evt-body");
+    if(d.open && !body && cur){ d.insertAdjacentHTML("beforeend", eventBody(cur)); }
+    if(!d.open && body){ d.removeChild(body); }
+    evtSchedule();
+  });
+  return row;
+}
+
+function evtPatchRow(row, e){
+  var sum = eventSummary(e);
+  if(row.summary === sum){ return; }
+  var open = evtIsOpen(e);
+  row.el.innerHTML = sum + (open ? eventBody(e) : "");
+  row.el.open = open;
+  row.summary = sum;
+}
+
+function renderEventWindow(){
+  evt.pending = false;
+  if(!evt.box){ return; }
+  var panel = document.getElementById("events-panel");
+  var list = evt.list, n = list.length;
+  var top = panel.scrollTop, bottom = top + (panel.clientHeight || 600);
+  var y = 0, first = 0;
+  while(first < n && y + evtHeight(list[first]) <= top){ y += evtHeight(list[first]); first++; }
+  var last = first;
+  while(last < n && y < bottom){ y += evtHeight(list[last]); last++; }
+  var start = Math.max(0, first - EVT_OVERSCAN), end = Math.min(n, last + EVT_OVERSCAN);
+  var padTop = 0, padBot = 0, k;
+  for(k = 0; k < start; k++){ padTop += evtHeight(list[k]); }
+  for(k = end; k < n; k++){ padBot += evtHeight(list[k]); }
+  evt.top.style.height = padTop + "px";
+  evt.bot.style.height = padBot + "px";
+
+  var keep = {}, box = evt.box;
+  for(k = start; k < end; k++){
+    var e = list[k];
+    var row = evt.rows[e.id] || (evt.rows[e.id] = evtRow(e));
+    keep[e.id] = true;
+    evtPatchRow(row, e);
+    var at = box.children[k - start];
+    if(at !== row.el){ box.insertBefore(row.el, at || null); }
+  }
+  Object.keys(evt.rows).forEach(function(id){
+    if(!keep[id]){
+      var r = evt.rows[id];
+      if(r.el.parentNode){ r.el.parentNode.removeChild(r.el); }
+      delete evt.rows[id];
+    }
+  });
+  // remember real heights so the spacers converge on the true list height
+  for(k = start; k < end; k++){
+    evt.heights[list[k].id] = evt.rows[list[k].id].el.offsetHeight + 8;
+  }
 }
+
+function evtSchedule(){
+  if(evt.pending){ return; }
+  evt.pending = true;
+  requestAnimationFrame(renderEventWindow);
+}
+
 function renderEvents(data){
   var panel = document.getElementById("events-panel");
   var events = (data && data.events) || [];
   if(!events.length){
+    evt.box = null; evt.rows = {};
     panel.innerHTML = '<div class="empty">no abnormal fan events recorded</div>';
     return;
   }
-  // remember which rows the user had expanded, restore after re-render
-  var openIds = {};
-  panel.querySelectorAll("details.evt[open]").forEach(function(d){
-    openIds[d.getAttribute("data-id")] = true;
-  });
-  panel.innerHTML = events.map(eventBlock).join("");
-  panel.querySelectorAll("details.evt").forEach(function(d){
-    if(openIds[d.getAttribute("data-id")]){ d.open = true; }
-  });
+  if(!evt.box){
+    panel.innerHTML = '<div></div><div></div><div></div>';
+    evt.top = panel.children[0]; evt.box = panel.children[1]; evt.bot = panel.children[2];
+  }
+  evt.list = events;
+  evt.byId = {};
+  events.forEach(function(e){ evt.byId[e.id] = e; });
+  renderEventWindow();
 }
+document.getElementById("events-panel").addEventListener("scroll", evtSchedule, {passive: true});
 
 function tick(){
   fetch("/api/state", {cache: "no-store"})
@@ -887,37 +2575,262 @@ setInterval(tick, 10000);
 </html>
 """
 
+# The page never changes while the process runs: encode + compress it once and
+# key it by content hash so browsers revalidate with a cheap 304. A strong
+# ETag names one representation, so the gzip body gets its own.
+INDEX_BODY = INDEX_HTML.encode("utf-8")
+INDEX_GZ = gzip.compress(INDEX_BODY, mtime=0)
+INDEX_ETAG = '"%s"' % hashlib.sha256(INDEX_BODY).hexdigest()[:16]
+INDEX_ETAG_GZ = INDEX_ETAG[:-1] + '-gz"'
+
 
 # --------------------------------------------------------------------------- #
 # HTTP server
 # --------------------------------------------------------------------------- #
 
+def _time_range(q):
+    """(from, to) unix seconds from parsed query args; raises ValueError."""
+    t_from = int(q["from"][0]) if q.get("from", [""])[0] else None
+    t_to = int(q["to"][0]) if q.get("to", [""])[0] else None
+    return t_from, t_to
+
+
+def _accepts_gzip(header):
+    """True if an Accept-Encoding header allows gzip (q=0 means refused)."""
+    for part in (header or "").split(","):
+        bits = part.strip().split(";")
+        coding = bits[0].strip().lower()
+        if coding not in ("gzip", "*"):
+            continue
+        q = 1.0
+        for b in bits[1:]:
+            b = b.strip()
+            if b.startswith("q="):
+                try:
+                    q = float(b[2:])
+                except ValueError:
+                    q = 0.0
+        return q > 0
+    return False
+
+
 class Handler(BaseHTTPRequestHandler):
     server_version = "fanwatch/1.0"
+    protocol_version = "HTTP/1.1"   # chunked exports; every other reply has a length
 
     def log_message(self, *args):  # quiet
         pass
 
-    def _send(self, code, body, ctype):
+    def _send(self, code, body, ctype, gz=None, headers=None):
+        """Write a response. `gz` is a precompressed body; otherwise bodies of
+        GZIP_MIN_BYTES or more are compressed when the client accepts it."""
         if isinstance(body, str):
             body = body.encode("utf-8")
+        headers = dict(headers or {})
+        headers.setdefault("Cache-Control", "no-store")
+        if _accepts_gzip(self.headers.get("Accept-Encoding")):
+            if gz is None and len(body) >= GZIP_MIN_BYTES:
+                gz = gzip.compress(body, compresslevel=5)
+            if gz is not None:
+                body = gz
+                headers["Content-Encoding"] = "gzip"
+        if gz is not None or len(body) >= GZIP_MIN_BYTES:
+            headers["Vary"] = "Accept-Encoding"
         self.send_response(code)
         self.send_header("Content-Type", ctype)
         self.send_header("Content-Length", str(len(body)))
-        self.send_header("Cache-Control", "no-store")
+        for k, v in headers.items():
+            self.send_header(k, v)
         self.end_headers()
         if self.command != "HEAD":
             self.wfile.write(body)
 
+    def _send_index(self):
+        # same choice of body as _send makes
+        gz = _accepts_gzip(self.headers.get("Accept-Encoding"))
+        etag = INDEX_ETAG_GZ if gz else INDEX_ETAG
+        cache = {"ETag": etag, "Cache-Control": "no-cache"}
+        inm = self.headers.get("If-None-Match") or ""
+        # weak comparison, as RFC 9110 prescribes for If-None-Match
+        tags = [t.strip() for t in inm.split(",")]
+        if etag in tags or "W/" + etag in tags or inm.strip() == "*":
+            self.send_response(304)
+            for k, v in cache.items():
+                self.send_header(k, v)
+            self.send_header("Vary", "Accept-Encoding")
+            self.end_headers()
+            return
+        self._send(200, INDEX_BODY, "text/html; charset=utf-8",
+                   gz=INDEX_GZ, headers=cache)
+
+    def _send_stream(self, ctype, filename, chunks):
+        """Stream an iterable of byte strings, chunked for HTTP/1.1 clients and
+        close-delimited for HTTP/1.0. Small rows are batched up to
+        EXPORT_CHUNK_BYTES per write."""
+        chunked = self.request_version != "HTTP/1.0"
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Cache-Control", "no-store")
+        self.send_header("Content-Disposition", 'attachment; filename="%s"' % filename)
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        else:
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        if self.command == "HEAD":
+            return
+
+        def write(data):
+            if chunked:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            else:
+                self.wfile.write(data)
+
+        buf, size = [], 0
+        try:
+            for data in chunks:
+                buf.append(data)
+                size += len(data)
+                if size >= EXPORT_CHUNK_BYTES:
+                    write(b"".join(buf))
+                    buf, size = [], 0
+            if buf:
+                write(b"".join(buf))
+            if chunked:
+                self.wfile.write(b"0\r\n\r\n")
+        except Exception:  # noqa: BLE001 - headers are out; just drop the connection
+            self.close_connection = True
+
+    def _send_export(self, kind, query):
+        q = urllib.parse.parse_qs(query)
+        try:
+            t_from, t_to = _time_range(q)
+        except ValueError:
+            self._send(400, json.dumps({"error": "from/to must be integers"}),
+                       "application/json")
+            return
+        labels = set(q.get("label", [])) or None
+        if AGGREGATE_SHARDS and kind in ("history.ndjson", "events.csv"):
+            ctype = "application/x-ndjson" if kind.endswith(".ndjson") else "text/csv; charset=utf-8"
+            self._send_stream(ctype, "fanwatch-" + kind, _iter_agg_export(kind, query))
+        elif kind == "history.ndjson":
+            self._send_stream("application/x-ndjson", "fanwatch-history.ndjson",
+                              _iter_history_ndjson(t_from, t_to, labels))
+        elif kind == "events.csv":
+            self._send_stream("text/csv; charset=utf-8", "fanwatch-events.csv",
+                              _iter_events_csv(t_from, t_to, labels))
+        else:
+            self._send(404, "not found", "text/plain")
+
+    def _send_history(self, label, query):
+        q = urllib.parse.parse_qs(query)
+        try:
+            points = int(q.get("points", [SPARK_POINTS])[0])
+            t_from, t_to = _time_range(q)
+        except ValueError:
+            self._send(400, json.dumps({"error": "points/from/to must be integers"}),
+                       "application/json")
+            return
+        points = max(3, min(points, HISTORY_POINTS))
+        hist = _history_for(label, t_from, t_to, points)
+        if hist is None:
+            self._send(404, json.dumps({"error": "unknown target"}), "application/json")
+            return
+        self._send(200, json.dumps({"label": label, "points": hist}), "application/json")
+
+    def _send_summary(self, label):
+        if AGGREGATE_SHARDS:
+            code, doc = _agg_proxy(label, "/api/state/" + urllib.parse.quote(label))
+            self._send(code, json.dumps(doc), "application/json")
+            return
+        body = _summary_json(label)
+        if body is None:
+            self._send(404, json.dumps({"error": "unknown target"}), "application/json")
+            return
+        self._send(200, body, "application/json")
+
+    def _send_iml(self, label, query):
+        if AGGREGATE_SHARDS:
+            code, doc = _agg_proxy(label, "/api/iml/%s?%s" % (urllib.parse.quote(label), query))
+            self._send(code, json.dumps(doc), "application/json")
+            return
+        try:
+            doc = _iml_snapshot(label, query)
+        except ValueError:
+            self._send(400, json.dumps({"error": "limit/from/to must be integers"}),
+                       "application/json")
+            return
+        if doc is None:
+            self._send(404, json.dumps({"error": "unknown target"}), "application/json")
+            return
+        self._send(200, json.dumps(doc), "application/json")
+
+    def do_POST(self):
+        try:
+            path = urllib.parse.urlsplit(self.path).path
+            n = int(self.headers.get("Content-Length") or 0)
+            if n > EVENT_MAX_BYTES:
+                # unread bytes would be parsed as the next keep-alive request
+                self.close_connection = True
+                self._send(413, json.dumps({"error": "body too large"}), "application/json",
+                           headers={"Connection": "close"})
+                return
+            if n > 0:
+                self.rfile.read(n)
+            if path.startswith("/api/iml/") and path.rstrip("/").endswith("/backfill"):
+                label = urllib.parse.unquote(path[len("/api/iml/"):].rstrip("/")[:-len("/backfill")])
+                if AGGREGATE_SHARDS:
+                    code, doc = _agg_proxy(label, "/api/iml/%s/backfill"
+                                           % urllib.parse.quote(label), method="POST")
+                elif _iml_request_backfill(label):
+                    code, doc = 202, {"queued": True}
+                else:
+                    code, doc = 404, {"error": "unknown target"}
+                self._send(code, json.dumps(doc), "application/json")
+            else:
+                self._send(404, "not found", "text/plain")
+        except Exception:  # noqa: BLE001
+            self.close_connection = True  # the body may not have been read
+            try:
+                self._send(503, json.dumps({"error": "internal"}), "application/json")
+            except Exception:  # noqa: BLE001
+                pass
+
     def do_GET(self):
         try:
-            if self.path == "/" or self.path.startswith("/index"):
-                self._send(200, INDEX_HTML, "text/html; charset=utf-8")
-            elif self.path.startswith("/api/state"):
-                self._send(200, json.dumps(_snapshot()), "application/json")
-            elif self.path.startswith("/api/events"):
-                self._send(200, json.dumps(_events_snapshot()), "application/json")
-            elif self.path == "/healthz":
+            url = urllib.parse.urlsplit(self.path)
+            path = url.path
+            if path == "/" or path.startswith("/index"):
+                self._send_index()
+            elif path.startswith("/api/history/"):
+                label = urllib.parse.unquote(path[len("/api/history/"):])
+                if AGGREGATE_SHARDS:
+                    code, doc = _agg_proxy(label, "/api/history/%s?%s"
+                                           % (urllib.parse.quote(label), url.query))
+                    self._send(code, json.dumps(doc), "application/json")
+                else:
+                    self._send_history(label, url.query)
+            elif path.startswith("/api/export/"):
+                self._send_export(path[len("/api/export/"):], url.query)
+            elif path.startswith("/api/state/"):
+                self._send_summary(urllib.parse.unquote(path[len("/api/state/"):]))
+            elif path.startswith("/api/summary"):
+                body = json.dumps(_agg_summary()) if AGGREGATE_SHARDS else _summaries_json()
+                self._send(200, body, "application/json")
+            elif path.startswith("/api/state"):
+                snap = _agg_state() if AGGREGATE_SHARDS else _snapshot()
+                self._send(200, json.dumps(snap), "application/json")
+            elif path.startswith("/api/events"):
+                evs = _agg_events() if AGGREGATE_SHARDS else _events_snapshot()
+                self._send(200, json.dumps(evs), "application/json")
+            elif path.startswith("/api/iml/"):
+                self._send_iml(urllib.parse.unquote(path[len("/api/iml/"):]), url.query)
+            elif path.startswith("/api/discovery"):
+                doc = ({"shards": _agg_fan_out("/api/discovery")} if AGGREGATE_SHARDS
+                       else _discovery_snapshot())
+                self._send(200, json.dumps(doc), "application/json")
+            elif path == "/healthz":
                 self._send(200, "ok", "text/plain")
             else:
                 self._send(404, "not found", "text/plain")
@@ -931,11 +2844,27 @@ class Handler(BaseHTTPRequestHandler):
 
 
 def main():
-    _events_init()
-    _start_pollers()
+    global EVENT_DESTINATION
+    if AGGREGATE_SHARDS:
+        banner = "aggregating %d shard(s): %s" % (len(AGGREGATE_SHARDS),
+                                                 ", ".join(AGGREGATE_SHARDS))
+    else:
+        _events_init()
+        if EVENT_DESTINATION and not _start_event_listener():
+            EVENT_DESTINATION = ""
+        _start_pollers()
+        if DISCOVER_CIDRS:
+            threading.Thread(target=_discovery_loop, daemon=True, name="discovery").start()
+        if TARGETS_FILE:
+            threading.Thread(target=_targets_watcher, daemon=True, name="targets").start()
+        banner = "targets: " + (", ".join("%s=%s" % (l, h) for l, h in TARGETS) or "(none)")
+        if DISCOVER_CIDRS:
+            banner += "  discovering: " + ", ".join(DISCOVER_CIDRS)
+        if SHARD_COUNT > 1:
+            banner += "  shard %d/%d (%d of %d targets)" % (
+                SHARD_INDEX, SHARD_COUNT, len(TARGETS), len(ALL_TARGETS))
     httpd = ThreadingHTTPServer(("0.0.0.0", PORT), Handler)
-    labels = ", ".join("%s=%s" % (l, h) for l, h in TARGETS) or "(none)"
-    print("fanwatch listening on :%d  targets: %s" % (PORT, labels), flush=True)
+    print("fanwatch listening on :%d  %s" % (PORT, banner), flush=True)
     try:
         httpd.serve_forever()
     except KeyboardInterrupt:
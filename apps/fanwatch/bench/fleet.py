@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""Fleet-scale load benchmark: fanwatch against N simulated iLO 4 BMCs.
+
+Starts sim/ilosim.py with N hosts and a fanwatch process polling all of them,
+lets it warm up, then samples for --duration seconds and reports:
+
+    poll lag      age of each target's newest sample minus POLL_SECONDS
+                  (p50 / p99 / max over all targets and samples)
+    online        targets fanwatch currently sees as online
+    cpu           fanwatch CPU time / wall time (1.0 = one core)
+    rss           fanwatch resident set size (peak of the samples)
+    threads       fanwatch thread count (peak)
+    /api/state    response time p50 / p99 and payload size
+
+Linux only (reads /proc/<pid>). Stdlib only.
+
+Run (from apps/fanwatch):
+    python3 bench/fleet.py --hosts 100 --poll-seconds 12 --duration 120
+    python3 bench/fleet.py --hosts 300 --latency 0.2 --jitter 0.15 --json out.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP = os.path.join(HERE, "..", "app.py")
+SIM = os.path.join(HERE, "..", "sim", "ilosim.py")
+CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def _pct(vals, p):
+    s = sorted(vals)
+    if not s:
+        return None
+    return s[min(len(s) - 1, int(p * len(s)))]
+
+
+def _proc_cpu(pid):
+    """utime + stime of pid in seconds."""
+    with open("/proc/%d/stat" % pid) as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / float(CLK_TCK)
+
+
+def _proc_status(pid):
+    out = {}
+    with open("/proc/%d/status" % pid) as f:
+        for line in f:
+            k, _, v = line.partition(":")
+            if k in ("VmRSS", "Threads"):
+                out[k] = int(v.split()[0])
+    return out.get("VmRSS", 0), out.get("Threads", 0)
+
+
+def _get_state(url):
+    t0 = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=30) as resp:
+        body = resp.read()
+    return time.perf_counter() - t0, len(body), json.loads(body)
+
+
+def _wait_line(proc, prefix, timeout):
+    """Read stdout lines until one starts with prefix; returns earlier lines."""
+    deadline = time.time() + timeout
+    seen = []
+    while time.time() < deadline:
+        line = proc.stdout.readline()
+        if not line:
+            break
+        if line.startswith(prefix):
+            return seen, line
+        seen.append(line.strip())
+    raise RuntimeError("timed out waiting for %r (got %r)" % (prefix, seen[-3:]))
+
+
+def run(args):
+    sim_cmd = [sys.executable, SIM, "--count", str(args.hosts),
+               "--base-port", str(args.base_port), "--latency", str(args.latency),
+               "--jitter", str(args.jitter), "--fail-rate", str(args.fail_rate),
+               "--scenario", args.scenario, "--print-targets"]
+    sim = subprocess.Popen(sim_cmd, stdout=subprocess.PIPE, text=True)
+    app = None
+    try:
+        targets, _ = _wait_line(sim, "ilosim ready", 60)
+        env = dict(os.environ,
+                   ILO_TARGETS=targets[-1], PORT=str(args.port),
+                   POLL_SECONDS=str(args.poll_seconds),
+                   IML_POLL_SECONDS=str(args.iml_poll_seconds),
+                   DATA_DIR=tempfile.mkdtemp(prefix="fanwatch-bench-"))
+        env.update(dict(kv.split("=", 1) for kv in args.env))
+        app = subprocess.Popen([sys.executable, APP], env=env,
+                               stdout=subprocess.PIPE, text=True)
+        _wait_line(app, "fanwatch listening", 60)
+        state_url = "http://127.0.0.1:%d/api/state" % args.port
+
+        time.sleep(args.warmup)
+        cpu0, wall0 = _proc_cpu(app.pid), time.time()
+        lags, api_t, api_bytes, rss, threads, online = [], [], 0, 0, 0, 0
+        end = time.time() + args.duration
+        while time.time() < end:
+            dt, size, state = _get_state(state_url)
+            api_t.append(dt)
+            api_bytes = size
+            online = 0
+            for t in state["targets"].values():
+                online += 1 if t["online"] else 0
+                if t["history"]:
+                    lags.append(max(0, state["ts"] - t["history"][-1]["t"] - args.poll_seconds))
+            r, th = _proc_status(app.pid)
+            rss, threads = max(rss, r), max(threads, th)
+            time.sleep(args.sample_every)
+        cpu = (_proc_cpu(app.pid) - cpu0) / (time.time() - wall0)
+    finally:
+        for p in (app, sim):
+            if p is not None:
+                p.terminate()
+                try:
+                    p.wait(10)
+                except subprocess.TimeoutExpired:
+                    p.kill()
+
+    return {
+        "hosts": args.hosts,
+        "poll_seconds": args.poll_seconds,
+        "sim": {"latency": args.latency, "jitter": args.jitter,
+                "fail_rate": args.fail_rate, "scenario": args.scenario},
+        "online": online,
+        "poll_lag_s": {"p50": _pct(lags, 0.5), "p99": _pct(lags, 0.99),
+                       "max": max(lags) if lags else None},
+        "cpu_cores": round(cpu, 4),
+        "rss_kib": rss,
+        "threads": threads,
+        "api_state_ms": {"p50": round(_pct(api_t, 0.5) * 1000, 2),
+                         "p99": round(_pct(api_t, 0.99) * 1000, 2),
+                         "bytes": api_bytes},
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="fanwatch fleet benchmark")
+    ap.add_argument("--hosts", type=int, default=50)
+    ap.add_argument("--duration", type=float, default=60, help="seconds sampled")
+    ap.add_argument("--warmup", type=float, default=15, help="seconds before sampling")
+    ap.add_argument("--sample-every", type=float, default=0.5)
+    ap.add_argument("--poll-seconds", type=int, default=12)
+    ap.add_argument("--iml-poll-seconds", type=int, default=180)
+    ap.add_argument("--latency", type=float, default=0.05)
+    ap.add_argument("--jitter", type=float, default=0.02)
+    ap.add_argument("--fail-rate", type=float, default=0.0)
+    ap.add_argument("--scenario", default="ramp")
+    ap.add_argument("--base-port", type=int, default=19443)
+    ap.add_argument("--port", type=int, default=18080, help="fanwatch HTTP port")
+    ap.add_argument("--env", action="append", default=[],
+                    help="extra KEY=VALUE for fanwatch (repeatable)")
+    ap.add_argument("--json", help="also write the result to this file")
+    args = ap.parse_args()
+
+    res = run(args)
+    lag, api = res["poll_lag_s"], res["api_state_ms"]
+    print("hosts %d  online %d  poll lag p50 %.1fs p99 %.1fs max %.1fs"
+          % (res["hosts"], res["online"], lag["p50"] or 0, lag["p99"] or 0, lag["max"] or 0))
+    print("cpu %.3f cores  rss %.1f MiB  threads %d"
+          % (res["cpu_cores"], res["rss_kib"] / 1024.0, res["threads"]))
+    print("/api/state p50 %.2fms p99 %.2fms  %d bytes" % (api["p50"], api["p99"], api["bytes"]))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(res, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
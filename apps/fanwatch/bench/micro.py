@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""Microbenchmarks for the fanwatch poll hot path - stdlib only.
+
+Each benchmark measures one poll round across a fleet of 1, 50 and 500
+targets built from the iLO 4 Thermal fixtures in bench/fixtures/ (every target
+gets a deterministic variation of a DL360 or DL380 Gen9 document):
+
+    parse_thermal      _parse_thermal on every target's document
+    compute_drivers    _compute_drivers on every target's temps
+    score_all_sensors  _score_all_sensors on every target's temps
+    capture_snapshot   _capture_snapshot for every target
+    detect_ramp        _detect_ramp for every target (full history window)
+    detect_anomalies   _detect_anomalies (per-sensor EWMA) for every target
+    snapshot           _snapshot() of the whole fleet
+    state_json         json.dumps(_snapshot())
+    summary_json       _summaries_json() (the /api/summary body)
+
+Timing uses time.perf_counter: each benchmark is auto-ranged to at least
+--min-time seconds per repeat and the min and median of --repeat runs are
+reported per round, in microseconds.
+
+Run (from apps/fanwatch):
+    python3 bench/micro.py --out base.json
+    python3 bench/micro.py --compare base.json --threshold 0.15
+
+With --compare, exits 1 if any benchmark's min time is slower than the
+baseline by more than --threshold (fraction), so it can gate a commit.
+"""
+
+import argparse
+import copy
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+os.environ.setdefault("DATA_DIR", os.path.join(HERE, ".bench-data"))
+
+import app  # noqa: E402
+
+FIXTURES = ["thermal-dl360-gen9.json", "thermal-dl380-gen9.json"]
+SIZES = (1, 50, 500)
+
+BENCHES = []
+
+
+def bench(name):
+    """Register a benchmark. The decorated function gets the fleet and
+    returns the zero-argument callable that runs one round."""
+    def deco(fn):
+        BENCHES.append((name, fn))
+        return fn
+    return deco
+
+
+# --------------------------------------------------------------------------- #
+# Fleet construction
+# --------------------------------------------------------------------------- #
+
+def _load_fixtures():
+    docs = []
+    for name in FIXTURES:
+        with open(os.path.join(HERE, "fixtures", name)) as f:
+            docs.append(json.load(f))
+    return docs
+
+
+def _vary(doc, i):
+    """Deterministic per-target variation so targets are not identical."""
+    d = copy.deepcopy(doc)
+    for j, fan in enumerate(d["Fans"]):
+        fan["CurrentReading"] = max(0, min(100, fan["CurrentReading"] + (i + j) % 9 - 4))
+    for j, t in enumerate(d["Temperatures"]):
+        if t["Status"].get("State") == "Enabled":
+            t["ReadingCelsius"] = t["ReadingCelsius"] + (i * 7 + j) % 5 - 2
+    return d
+
+
+def build_fleet(n, fixtures):
+    """Populate app._state with n targets (full history) and return
+    [(label, host, doc, maxfan, fans, temps)]."""
+    app._state.clear()
+    del app._events[:]
+    app._persist_ok = False
+    now = time.time()
+    fleet = []
+    for i in range(n):
+        label, host = "T%03d" % i, "10.0.%d.%d" % (i // 250, i % 250 + 1)
+        doc = _vary(fixtures[i % len(fixtures)], i)
+        maxfan, fans, temps = app._parse_thermal(doc)
+        hist = app.deque(maxlen=app.HISTORY_POINTS)
+        for k in range(app.HISTORY_POINTS):
+            hist.append({"t": int(now - (app.HISTORY_POINTS - k) * app.POLL_SECONDS),
+                         "maxfan": maxfan + k % 3, "watts": 200 + k % 11})
+        st = app._new_state(host)
+        st.update({
+            "online": True, "maxfan": maxfan, "fans": fans,
+            "drivers": app._compute_drivers(temps), "temps": temps,
+            "events": [{"created": "2026-01-01T00:00:00Z", "severity": "OK",
+                        "message": "Server power restored"}] * app.IML_FETCH_COUNT,
+            "history": hist, "last_thermal_ok": now, "last_iml_ok": now,
+            "power": {"watts": 210, "psus": []},
+        })
+        app._state[label] = st
+        app._update_summary(label)
+        fleet.append((label, host, doc, maxfan, fans, temps))
+    return fleet
+
+
+# --------------------------------------------------------------------------- #
+# Benchmarks
+# --------------------------------------------------------------------------- #
+
+@bench("parse_thermal")
+def _b_parse(fleet):
+    docs = [f[2] for f in fleet]
+    return lambda: [app._parse_thermal(d) for d in docs]
+
+
+@bench("compute_drivers")
+def _b_drivers(fleet):
+    temps = [f[5] for f in fleet]
+    return lambda: [app._compute_drivers(t) for t in temps]
+
+
+@bench("score_all_sensors")
+def _b_score(fleet):
+    temps = [f[5] for f in fleet]
+    return lambda: [app._score_all_sensors(t) for t in temps]
+
+
+@bench("capture_snapshot")
+def _b_capture(fleet):
+    ev = {}
+    iml = app._state[fleet[0][0]]["events"]
+
+    def run():
+        for _label, _host, _doc, _maxfan, fans, temps in fleet:
+            app._capture_snapshot(ev, fans, temps, iml)
+    return run
+
+
+@bench("detect_ramp")
+def _b_detect(fleet):
+    now = time.time()
+
+    def run():
+        with app._lock:
+            for label, host, _doc, maxfan, fans, temps in fleet:
+                app._detect_ramp(label, host, now, maxfan, fans, temps)
+    return run
+
+
+@bench("detect_anomalies")
+def _b_anomalies(fleet):
+    now = time.time()
+
+    def run():
+        with app._lock:
+            for label, host, _doc, maxfan, fans, temps in fleet:
+                app._detect_anomalies(label, host, now, maxfan, fans, temps)
+    return run
+
+
+@bench("snapshot")
+def _b_snapshot(fleet):
+    return app._snapshot
+
+
+@bench("state_json")
+def _b_state_json(fleet):
+    return lambda: json.dumps(app._snapshot())
+
+
+@bench("summary_json")
+def _b_summary_json(fleet):
+    return app._summaries_json
+
+
+# --------------------------------------------------------------------------- #
+# Runner
+# --------------------------------------------------------------------------- #
+
+def _time(fn, repeat, min_time):
+    """(min, median) seconds per call, auto-ranging loops per repeat."""
+    loops = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        dt = time.perf_counter() - t0
+        if dt >= min_time:
+            break
+        loops *= 2 if dt < min_time / 4 else 1 + int(min_time / max(dt, 1e-9))
+    runs = [dt / loops]
+    for _ in range(repeat - 1):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        runs.append((time.perf_counter() - t0) / loops)
+    return min(runs), statistics.median(runs), loops
+
+
+def _git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(sizes, only, repeat, min_time):
+    fixtures = _load_fixtures()
+    results = {}
+    for n in sizes:
+        fleet = build_fleet(n, fixtures)
+        for name, make in BENCHES:
+            if only and name not in only:
+                continue
+            lo, med, loops = _time(make(fleet), repeat, min_time)
+            key = "%s/%d" % (name, n)
+            results[key] = {"min_us": round(lo * 1e6, 2), "median_us": round(med * 1e6, 2),
+                            "loops": loops}
+            print("%-26s %12.1f us  (median %.1f, %d loops)"
+                  % (key, lo * 1e6, med * 1e6, loops), flush=True)
+    return {
+        "meta": {"python": platform.python_version(), "machine": platform.machine(),
+                 "git": _git_rev(), "time": int(time.time()),
+                 "repeat": repeat, "min_time": min_time},
+        "results": results,
+    }
+
+
+def compare(cur, base, threshold):
+    """Print deltas against a baseline; return the regressed keys."""
+    bad = []
+    print("\n%-26s %12s %12s %8s" % ("benchmark", "base us", "now us", "delta"))
+    for key, r in sorted(cur["results"].items()):
+        b = base.get("results", {}).get(key)
+        if not b:
+            print("%-26s %12s %12.1f %8s" % (key, "-", r["min_us"], "new"))
+            continue
+        delta = (r["min_us"] - b["min_us"]) / b["min_us"] if b["min_us"] else 0.0
+        flag = "  REGRESSED" if delta > threshold else ""
+        print("%-26s %12.1f %12.1f %+7.1f%%%s" % (key, b["min_us"], r["min_us"], delta * 100, flag))
+        if delta > threshold:
+            bad.append(key)
+    return bad
+
+
+def main():
+    ap = argparse.ArgumentParser(description="fanwatch hot-path microbenchmarks")
+    ap.add_argument("--sizes", default=",".join(str(s) for s in SIZES),
+                    help="comma list of fleet sizes")
+    ap.add_argument("--only", default="", help="comma list of benchmark names")
+    ap.add_argument("--repeat", type=int, default=7)
+    ap.add_argument("--min-time", type=float, default=0.2, help="seconds per repeat")
+    ap.add_argument("--out", help="write JSON results here")
+    ap.add_argument("--compare", help="baseline JSON to compare against")
+    ap.add_argument("--threshold", type=float, default=0.15,
+                    help="allowed slowdown vs baseline (fraction)")
+    args = ap.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    only = set(s.strip() for s in args.only.split(",") if s.strip())
+    res = run(sizes, only, args.repeat, args.min_time)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(res, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            base = json.load(f)
+        bad = compare(res, base, args.threshold)
+        if bad:
+            print("\n%d benchmark(s) regressed more than %.0f%%: %s"
+                  % (len(bad), args.threshold * 100, ", ".join(bad)))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""Fake HPE iLO 4 Redfish server for exercising fanwatch - stdlib only.
+
+Emulates many BMCs from one process: each simulated host gets its own HTTPS
+listener, either on consecutive ports of one address (--spread port) or on the
+same port of consecutive addresses (--spread ip, e.g. 127.0.1.1, 127.0.1.2...).
+
+Serves the resources fanwatch touches:
+    /redfish/v1/                                   service root (model, serial)
+    /redfish/v1/Systems/1/                         system (model, serial)
+    /redfish/v1/Chassis/1/Thermal/                 fans + temperatures
+    /redfish/v1/Chassis/1/Power/                   PSU power draw
+    /redfish/v1/Systems/1/LogServices/IML/Entries/ IML collection + members
+                                                   ($top/$skip, nextLink paging)
+    /redfish/v1/SessionService/Sessions/           POST login / DELETE logout
+    /redfish/v1/EventService/Subscriptions/        GET / POST / DELETE; ramp
+                                                   starts are pushed to them
+
+Run:
+    python3 sim/ilosim.py --count 50 --base-port 9443 --latency 0.05 \\
+        --jitter 0.02 --fail-rate 0.01 --scenario ramp --print-targets
+
+Scenarios are a looping list of steps; a step sets the fan floor and can heat
+one sensor. Built-ins: "steady" and "ramp" (a 60s ramp to 85% every 5 min).
+A JSON file {"period": 600, "steps": [{"at": 0, "fan": 22},
+{"at": 120, "fan": 80, "sensor": "12-PCI 1 Zone", "temp": 82, "iml": "..."}]}
+can be passed instead. Each host runs the scenario with its own phase offset.
+
+TLS: pass --cert/--key, otherwise a throwaway self-signed pair is generated
+with the openssl CLI.
+"""
+
+import argparse
+import base64
+import json
+import os
+import random
+import shutil
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --------------------------------------------------------------------------- #
+# Scenarios
+# --------------------------------------------------------------------------- #
+
+SCENARIOS = {
+    "steady": {"period": 600, "steps": [{"at": 0, "fan": 24}]},
+    "ramp": {"period": 300, "steps": [
+        {"at": 0, "fan": 24},
+        {"at": 200, "fan": 85, "sensor": "12-PCI 1 Zone", "temp": 84,
+         "iml": "System Overheating (PCI 1 Zone)", "severity": "Warning"},
+        {"at": 260, "fan": 24},
+    ]},
+}
+
+SENSOR_NAMES = [
+    "01-Inlet Ambient", "02-CPU 1", "03-CPU 2", "04-P1 DIMM 1-6",
+    "05-P1 DIMM 7-12", "06-P2 DIMM 1-6", "07-P2 DIMM 7-12", "08-HD Max",
+    "09-Exp Bay Drive", "10-Chipset", "11-PS 1 Inlet", "12-PCI 1 Zone",
+    "13-PCI 2 Zone", "14-HD Controller", "15-LOM Card", "16-Sys Exhaust",
+]
+SENSOR_CRIT = {"01-Inlet Ambient": 42, "02-CPU 1": 70, "03-CPU 2": 70,
+               "08-HD Max": 60, "11-PS 1 Inlet": 60}
+
+
+def _load_scenario(name):
+    if name in SCENARIOS:
+        return SCENARIOS[name]
+    with open(name) as f:
+        sc = json.load(f)
+    sc["steps"] = sorted(sc["steps"], key=lambda s: s["at"])
+    return sc
+
+
+# --------------------------------------------------------------------------- #
+# One simulated BMC
+# --------------------------------------------------------------------------- #
+
+class SimHost:
+    """State of one fake iLO. Readings are derived from the scenario clock so
+    every request is cheap and consistent across threads."""
+
+    def __init__(self, idx, scenario, args):
+        self.idx = idx
+        self.args = args
+        self.scenario = scenario
+        self.phase = (idx * 37) % max(1, int(scenario["period"]))
+        self.serial = "SIM%07d" % idx
+        self.model = "ProLiant DL360 Gen9" if idx % 2 else "ProLiant DL380 Gen9"
+        self.lock = threading.Lock()
+        self.iml = [{"Created": "2026-01-01T00:%02d:00Z" % (i % 60),
+                     "Severity": "OK", "Message": "Server power restored (%d)" % i}
+                    for i in range(args.iml_entries)]
+        self.subs = {}
+        self.sub_seq = 0
+        self.sessions = set()
+        self.last_step = None
+
+    def step(self, now=None):
+        """Current scenario step; a step change may log IML and push events."""
+        now = time.time() if now is None else now
+        t = (now + self.phase) % self.scenario["period"]
+        cur = self.scenario["steps"][0]
+        for s in self.scenario["steps"]:
+            if s["at"] <= t:
+                cur = s
+        with self.lock:
+            changed = cur is not self.last_step
+            self.last_step = cur
+        if changed and cur.get("iml"):
+            self._log(cur["iml"], cur.get("severity", "Warning"))
+        return cur
+
+    def _log(self, message, severity):
+        created = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        with self.lock:
+            self.iml.append({"Created": created, "Severity": severity, "Message": message})
+            n = len(self.iml)
+            subs = list(self.subs.values())
+        origin = "/redfish/v1/Systems/1/LogServices/IML/Entries/%d/" % n
+        for sub in subs:
+            payload = {"Context": sub.get("Context"), "Events": [{
+                "EventType": "Alert", "EventTimestamp": created, "Severity": severity,
+                "Message": message, "Context": sub.get("Context"),
+                "OriginOfCondition": {"@odata.id": origin}}]}
+            threading.Thread(target=_push, args=(sub.get("Destination"), payload),
+                             daemon=True).start()
+
+    def thermal(self):
+        s = self.step()
+        rnd = random.Random(int(time.time() / 5) * 1000 + self.idx)
+        fan = s.get("fan", 24)
+        fans = [{"FanName": "Fan %d" % (i + 1), "CurrentReading": max(0, min(100, fan + rnd.randint(-2, 2))),
+                 "Units": "Percent", "Status": {"State": "Enabled", "Health": "OK"}}
+                for i in range(self.args.fans)]
+        temps = []
+        for i, name in enumerate(SENSOR_NAMES[:self.args.sensors]):
+            c = 24 + (i * 3) % 22 + rnd.randint(0, 2)
+            if name == s.get("sensor"):
+                c = s.get("temp", c)
+            if name == "08-HD Max":
+                c = 58  # the non-HP SSD offset reading fanwatch neutralizes
+            temps.append({"Name": name, "ReadingCelsius": c,
+                          "UpperThresholdCritical": SENSOR_CRIT.get(name, 100),
+                          "Status": {"State": "Enabled", "Health": "OK"}})
+        return {"@odata.id": "/redfish/v1/Chassis/1/Thermal/", "Fans": fans, "Temperatures": temps}
+
+    def power(self):
+        s = self.step()
+        watts = 140 + int(s.get("fan", 24) * 1.6) + self.idx % 20
+        return {"@odata.id": "/redfish/v1/Chassis/1/Power/",
+                "PowerControl": [{"PowerConsumedWatts": watts}],
+                "PowerSupplies": [
+                    {"Name": "HpServerPowerSupply", "LastPowerOutputWatts": watts // 2 + 1,
+                     "PowerCapacityWatts": 500, "Status": {"State": "Enabled", "Health": "OK"}},
+                    {"Name": "HpServerPowerSupply", "LastPowerOutputWatts": watts // 2,
+                     "PowerCapacityWatts": 500, "Status": {"State": "Enabled", "Health": "OK"}},
+                ]}
+
+
+def _push(dest, payload):
+    if not dest:
+        return
+    try:
+        req = urllib.request.Request(dest, data=json.dumps(payload).encode("utf-8"),
+                                     method="POST",
+                                     headers={"Content-Type": "application/json"})
+        urllib.request.urlopen(req, timeout=5, context=ssl._create_unverified_context()).close()
+    except Exception:  # noqa: BLE001 - receiver may be down
+        pass
+
+
+# --------------------------------------------------------------------------- #
+# HTTP
+# --------------------------------------------------------------------------- #
+
+IML_BASE = "/redfish/v1/Systems/1/LogServices/IML/Entries/"
+SUBS_BASE = "/redfish/v1/EventService/Subscriptions/"
+SESSIONS_BASE = "/redfish/v1/SessionService/Sessions/"
+
+
+class SimHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "HPE-iLO-Server/1.30"
+    sim = None  # SimHost, set per listener subclass
+
+    def log_message(self, *args):  # quiet
+        pass
+
+    def _json(self, code, doc, headers=None):
+        body = json.dumps(doc).encode("utf-8") if doc is not None else b""
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _delay_or_fail(self):
+        """Apply the configured latency/jitter; True if this request fails."""
+        a = self.sim.args
+        d = a.latency + random.uniform(-a.jitter, a.jitter)
+        if d > 0:
+            time.sleep(d)
+        if a.fail_rate and random.random() < a.fail_rate:
+            self._json(503, {"error": {"code": "Base.1.0.InternalError"}})
+            return True
+        return False
+
+    def _authed(self):
+        a = self.sim.args
+        tok = self.headers.get("X-Auth-Token")
+        if tok:
+            return tok in self.sim.sessions
+        auth = self.headers.get("Authorization") or ""
+        if not auth.startswith("Basic "):
+            return False
+        if a.password is None:
+            return True
+        try:
+            user, _, pw = base64.b64decode(auth[6:]).decode("utf-8").partition(":")
+        except Exception:  # noqa: BLE001
+            return False
+        return user == a.user and pw == a.password
+
+    def _body(self):
+        n = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(n) if n > 0 else b""
+        try:
+            return json.loads(raw.decode("utf-8")) if raw else {}
+        except ValueError:
+            return {}
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        path = url.path if url.path.endswith("/") else url.path + "/"
+        if path == "/redfish/v1/":
+            return self._json(200, self._root())  # root is unauthenticated
+        if self._delay_or_fail():
+            return
+        if not self._authed():
+            return self._json(401, {"error": {"code": "Base.1.0.NoValidSession"}})
+        h = self.sim
+        if path == "/redfish/v1/Chassis/1/Thermal/":
+            return self._json(200, h.thermal())
+        if path == "/redfish/v1/Chassis/1/Power/":
+            return self._json(200, h.power())
+        if path == "/redfish/v1/Systems/1/":
+            return self._json(200, {"@odata.id": path, "Model": h.model,
+                                    "SerialNumber": h.serial, "Manufacturer": "HP"})
+        if path == IML_BASE:
+            return self._json(200, self._iml_page(urllib.parse.parse_qs(url.query)))
+        if path.startswith(IML_BASE):
+            try:
+                n = int(path[len(IML_BASE):].strip("/"))
+                with h.lock:
+                    entry = dict(h.iml[n - 1]) if 1 <= n <= len(h.iml) else None
+            except ValueError:
+                entry = None
+            if entry is None:
+                return self._json(404, None)
+            entry.update({"@odata.id": path, "Id": str(n)})
+            return self._json(200, entry)
+        if path == SUBS_BASE:
+            with h.lock:
+                members = [{"@odata.id": u} for u in h.subs]
+            return self._json(200, {"Members": members, "Members@odata.count": len(members)})
+        if path in h.subs:
+            return self._json(200, dict(h.subs[path], **{"@odata.id": path}))
+        self._json(404, None)
+
+    def do_POST(self):
+        path = urllib.parse.urlsplit(self.path).path
+        body = self._body()
+        if self._delay_or_fail():
+            return
+        h = self.sim
+        if path.rstrip("/") + "/" == SESSIONS_BASE:
+            a = h.args
+            if a.password is not None and (body.get("UserName") != a.user
+                                           or body.get("Password") != a.password):
+                return self._json(401, None)
+            tok = base64.b16encode(os.urandom(16)).decode("ascii").lower()
+            h.sessions.add(tok)
+            return self._json(201, {}, {"X-Auth-Token": tok,
+                                        "Location": SESSIONS_BASE + tok + "/"})
+        if not self._authed():
+            return self._json(401, None)
+        if path.rstrip("/") + "/" == SUBS_BASE:
+            with h.lock:
+                h.sub_seq += 1
+                uri = "%s%d/" % (SUBS_BASE, h.sub_seq)
+                h.subs[uri] = body
+            return self._json(201, {}, {"Location": uri})
+        self._json(405, None)
+
+    def do_DELETE(self):
+        path = urllib.parse.urlsplit(self.path).path
+        path = path if path.endswith("/") else path + "/"
+        h = self.sim
+        if path.startswith(SESSIONS_BASE):
+            h.sessions.discard(path[len(SESSIONS_BASE):].strip("/"))
+            return self._json(200, {})
+        if not self._authed():
+            return self._json(401, None)
+        with h.lock:
+            found = h.subs.pop(path, None)
+        self._json(200 if found is not None else 404, {})
+
+    def _root(self):
+        h = self.sim
+        return {"@odata.id": "/redfish/v1/", "RedfishVersion": "1.0.0",
+                "UUID": "00000000-0000-0000-0000-%012d" % h.idx,
+                "Systems": {"@odata.id": "/redfish/v1/Systems/"},
+                "Oem": {"Hp": {"Manager": [{"ManagerType": "iLO 4",
+                                            "ManagerFirmwareVersion": "2.82"}]}},
+                "Product": h.model, "SerialNumber": h.serial}
+
+    def _iml_page(self, q):
+        h = self.sim
+        with h.lock:
+            total = len(h.iml)
+        try:
+            skip = int(q.get("$skip", ["0"])[0])
+            top = int(q.get("$top", [str(h.args.page_size or total)])[0])
+        except ValueError:
+            skip, top = 0, total
+        end = min(total, skip + max(0, top))
+        doc = {"@odata.id": IML_BASE, "Members@odata.count": total,
+               "Members": [{"@odata.id": "%s%d/" % (IML_BASE, i + 1)}
+                           for i in range(skip, end)]}
+        if end < total and (h.args.page_size or "$top" in q):
+            doc["Members@odata.nextLink"] = "%s?$skip=%d&$top=%d" % (IML_BASE, end, top)
+        return doc
+
+
+# --------------------------------------------------------------------------- #
+# Main
+# --------------------------------------------------------------------------- #
+
+def _self_signed():
+    if not shutil.which("openssl"):
+        sys.exit("ilosim: no --cert/--key given and openssl not found")
+    d = tempfile.mkdtemp(prefix="ilosim-")
+    cert, key = os.path.join(d, "cert.pem"), os.path.join(d, "key.pem")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+                    "-keyout", key, "-out", cert, "-days", "2", "-subj", "/CN=ilosim"],
+                   check=True, capture_output=True)
+    return cert, key
+
+
+def _addresses(args):
+    if args.spread == "port":
+        return [(args.bind, args.base_port + i) for i in range(args.count)]
+    parts = [int(x) for x in args.bind.split(".")]
+    base = (parts[0] << 24) | (parts[1] << 16) | (parts[2] << 8) | parts[3]
+    out = []
+    for i in range(args.count):
+        n = base + i
+        out.append(("%d.%d.%d.%d" % (n >> 24 & 255, n >> 16 & 255, n >> 8 & 255, n & 255),
+                    args.base_port))
+    return out
+
+
+def serve(args):
+    """Start one listener per simulated host. Returns [(label, addr, port)]."""
+    scenario = _load_scenario(args.scenario)
+    cert, key = (args.cert, args.key) if args.cert and args.key else _self_signed()
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    ctx.load_cert_chain(cert, key)
+    hosts = []
+    for i, (addr, port) in enumerate(_addresses(args)):
+        sim = SimHost(i + 1, scenario, args)
+        handler = type("SimHandler%d" % (i + 1), (SimHandler,), {"sim": sim})
+        httpd = ThreadingHTTPServer((addr, port), handler)
+        httpd.daemon_threads = True
+        httpd.socket = ctx.wrap_socket(httpd.socket, server_side=True)
+        threading.Thread(target=httpd.serve_forever, daemon=True,
+                         name="sim-%d" % (i + 1)).start()
+        hosts.append(("SIM%03d" % (i + 1), addr, port))
+    return hosts
+
+
+def build_parser():
+    ap = argparse.ArgumentParser(description="Fake iLO 4 Redfish fleet")
+    ap.add_argument("--count", type=int, default=1, help="simulated BMCs")
+    ap.add_argument("--bind", default="127.0.0.1", help="(first) listen address")
+    ap.add_argument("--base-port", type=int, default=9443)
+    ap.add_argument("--spread", choices=("port", "ip"), default="port",
+                    help="one port per host, or one address per host")
+    ap.add_argument("--latency", type=float, default=0.02, help="seconds per request")
+    ap.add_argument("--jitter", type=float, default=0.0, help="+/- seconds")
+    ap.add_argument("--fail-rate", type=float, default=0.0, help="0..1, answered 503")
+    ap.add_argument("--scenario", default="ramp", help="steady | ramp | FILE.json")
+    ap.add_argument("--fans", type=int, default=7)
+    ap.add_argument("--sensors", type=int, default=len(SENSOR_NAMES))
+    ap.add_argument("--iml-entries", type=int, default=40)
+    ap.add_argument("--page-size", type=int, default=0,
+                    help="IML collection page size (0 = unpaged unless $top)")
+    ap.add_argument("--user", default="Administrator")
+    ap.add_argument("--password", default=None, help="require this password")
+    ap.add_argument("--cert")
+    ap.add_argument("--key")
+    ap.add_argument("--print-targets", action="store_true",
+                    help="print an ILO_TARGETS value for the fleet")
+    return ap
+
+
+def main():
+    args = build_parser().parse_args()
+    hosts = serve(args)
+    if args.print_targets:
+        print(",".join("%s=%s:%d" % h for h in hosts), flush=True)
+    print("ilosim ready: %d host(s), scenario %s, latency %.3fs +/- %.3fs, fail %.1f%%"
+          % (len(hosts), args.scenario, args.latency, args.jitter, args.fail_rate * 100),
+          flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -31,6 +31,70 @@ Incus instance metrics (TrueNAS 25.04+):
 - truenas_virt_state: Instance state (1=RUNNING, 0=STOPPED, -1=ERROR)
 - truenas_virt_info: Instance metadata (type, cpu, memory)
 
+Exporter metrics:
+- truenas_exporter_cache_age_seconds: Seconds since an endpoint was last fetched successfully
+- truenas_exporter_refresh_interval_seconds: Configured refresh interval per endpoint
+- truenas_exporter_subscription_up: 1 if a subscribe-mode target's WebSocket is live
+- truenas_exporter_stale: 1 if a target is served from last good values
+- truenas_exporter_collect_duration_seconds: Duration of the target's last collection
+- truenas_exporter_request_duration_seconds: Histogram of API request latency per endpoint
+- truenas_exporter_request_errors_total: API request errors by type (timeout, tls,
+  http_<code>, json, connection, rpc, other)
+- truenas_exporter_response_size_bytes: Payload size of the last response per endpoint
+- truenas_exporter_response_bytes_total: Payload bytes received per endpoint
+- truenas_exporter_series: Series emitted by each collector in the last render
+- truenas_exporter_render_duration_seconds: Time to render the last exposition
+
+Collection runs in a background thread. Each endpoint has its own refresh
+interval (`<endpoint>_refresh_interval` config keys; defaults replication 30,
+pool 60, app/vm/virt 15; `collect_interval` or --interval replaces the
+default for every endpoint not set explicitly) and is served from cache
+between refreshes. /metrics serves the last rendered exposition from memory,
+so scrapes never wait on the TrueNAS API.
+
+Every (target, endpoint) pair of a collection is fetched concurrently through
+a pool of `max_workers` threads (default 16), with at most
+`max_concurrency_per_target` requests (default 3; per-target override
+`max_concurrency`) in flight against any one NAS. Requests reuse keep-alive
+connections from a per-target pool; the SSL contexts are built once.
+
+A collection waits at most `collect_deadline` seconds (default 12), and each
+target gets `target_budget` seconds (default 10; per-target `budget`) for
+all of its requests. Whatever finished in time is emitted. Endpoints that
+timed out keep their last good values and their target is flagged stale;
+calls still running at the deadline are picked up by the next collection.
+
+Targets with `mode: subscribe` (top-level default or per target) are not
+polled. The exporter keeps one WebSocket to the middleware JSON-RPC API per
+target (`ws_path`, default /api/current), subscribes to the pool, app, VM and
+Incus instance collections with core.subscribe, and applies the change
+events to an in-memory model; scrapes are rendered from that model with no
+API calls. Replication state is not published as collection events, so it is
+re-queried over the same socket every `replication_refresh_interval` and
+whenever a replication job finishes.
+
+/metrics?collect[]=app&collect[]=vm renders only the named collectors
+(replication, pool, app, vm, virt) and their exporter metrics, so cheap and
+expensive collectors can be scraped at different intervals; set the
+matching `<endpoint>_refresh_interval` so the API calls follow.
+
+/probe?target=<name> (blackbox-exporter style, also takes collect[]) returns
+one target's metrics, so Prometheus can scrape each NAS as its own job with
+its own interval, timeout and `up`. Targets with `mode: probe` are left out
+of the background collection and /metrics; each probe fetches them live,
+within the scrape timeout Prometheus sends (capped at `collect_deadline`),
+and adds truenas_exporter_probe_success (endpoints the NAS does not have,
+such as virt before 25.04, do not count against it) and
+truenas_exporter_probe_duration_seconds. Probes of other targets are served
+from the cache.
+
+Overlapping collections are coalesced: a scrape that arrives before the first
+collection finishes joins the in-flight one instead of starting another.
+HTTP requests are served by a fixed pool of `http_workers` threads
+(default 8), so a slow scrape never blocks /healthz. At most `http_queue`
+connections (default 32) wait for a free thread; beyond that new ones get
+an immediate 503.
+
 Usage:
     ./truenas-exporter.py --config /etc/truenas-exporter/config.yaml
     ./truenas-exporter.py --config config.yaml --port 9814
@@ -40,17 +104,60 @@ License: MIT
 """
 
 import argparse
+import base64
+import concurrent.futures
+import hashlib
+import http.client
 import json
 import logging
+import os
+import queue
+import socket
 import ssl
+import struct
 import sys
+import threading
 import time
-import urllib.request
-from http.server import HTTPServer, BaseHTTPRequestHandler
-from urllib.error import URLError, HTTPError
+import urllib.parse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 
 __version__ = "1.0.0"
 
+# Seconds between refreshes of each endpoint
+DEFAULT_REFRESH_INTERVALS = {
+    "replication": 30,
+    "pool": 60,
+    "app": 15,
+    "vm": 15,
+    "virt": 15,
+}
+# An endpoint is refreshed when it is due within this many seconds
+REFRESH_SLACK = 1
+
+# Errors after which the last good values are served instead
+TIMED_OUT = "timed out"
+BUDGET_EXCEEDED = "target budget exceeded"
+DEADLINE_EXCEEDED = "collection deadline exceeded"
+TARGET_BUSY = "target concurrency limit reached"
+TIMEOUT_ERRORS = {TIMED_OUT, BUDGET_EXCEEDED, DEADLINE_EXCEEDED, TARGET_BUSY}
+
+# Request latency histogram buckets (seconds)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DEFAULT_MAX_WORKERS = 16
+DEFAULT_MAX_CONCURRENCY_PER_TARGET = 3
+DEFAULT_HTTP_WORKERS = 8
+DEFAULT_HTTP_QUEUE = 32
+DEFAULT_COLLECT_DEADLINE = 12
+DEFAULT_TARGET_BUDGET = 10
+DEFAULT_WS_PATH = "/api/current"
+# Seconds of WebSocket silence before the exporter pings the middleware
+SUBSCRIBE_IDLE_SECONDS = 30
+SUBSCRIBE_MAX_BACKOFF = 60
+API_TIMEOUT = 10
+MAX_IDLE_CONNECTIONS = 8
+# Same-host redirects followed per request
+MAX_REDIRECTS = 3
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -257,56 +364,759 @@ def load_config(config_path):
         sys.exit(1)
 
 
-def fetch_api(target, endpoint):
-    """Fetch data from TrueNAS API endpoint."""
-    url = f"{target['api_url']}/api/v2.0/{endpoint}"
+class SelfMetrics:
+    """
+    Exporter self-instrumentation.
+
+    fetch_api() (and the subscribers' queries) record per-request latency,
+    errors and payload sizes; generate_sections() records series counts and
+    render time. lines() renders them in the exposition format.
+    """
 
-    # Create SSL context
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._latency = {}       # (host, endpoint) -> [cumulative bucket counts..., sum, count]
+        self._errors = {}        # (host, endpoint, type) -> count
+        self._size = {}          # (host, endpoint) -> bytes of the last response
+        self._bytes_total = {}   # (host, endpoint) -> bytes received
+        self._series = {}        # collector -> series in the last render
+        self._render_seconds = None
+
+    def observe_request(self, host, endpoint, seconds, size=None, error=None):
+        key = (host, endpoint)
+        with self._lock:
+            hist = self._latency.get(key)
+            if hist is None:
+                hist = self._latency[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    hist[i] += 1
+            hist[-2] += seconds
+            hist[-1] += 1
+            if size is not None:
+                self._size[key] = size
+                self._bytes_total[key] = self._bytes_total.get(key, 0) + size
+            if error is not None:
+                self._errors[key + (error,)] = self._errors.get(key + (error,), 0) + 1
+
+    def observe_render(self, series, seconds):
+        with self._lock:
+            self._series = dict(series)
+            self._render_seconds = seconds
+
+    def lines(self, collectors=None):
+        """Exposition lines, limited to the given collectors' endpoints if any."""
+        def wanted(key):
+            return collectors is None or key[1] in collectors
+
+        with self._lock:
+            latency = {k: list(v) for k, v in self._latency.items() if wanted(k)}
+            errors = {k: v for k, v in self._errors.items() if wanted(k)}
+            size = {k: v for k, v in self._size.items() if wanted(k)}
+            bytes_total = {k: v for k, v in self._bytes_total.items() if wanted(k)}
+            series = {k: v for k, v in self._series.items() if collectors is None or k in collectors}
+            render_seconds = self._render_seconds
+
+        lines = []
+        lines.append("# HELP truenas_exporter_request_duration_seconds TrueNAS API request latency")
+        lines.append("# TYPE truenas_exporter_request_duration_seconds histogram")
+        for (host, endpoint), hist in sorted(latency.items()):
+            labels = f'host="{escape_label_value(host)}",endpoint="{endpoint}"'
+            for bound, count in zip(self.buckets, hist):
+                lines.append(f'truenas_exporter_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'truenas_exporter_request_duration_seconds_bucket{{{labels},le="+Inf"}} {hist[-1]}')
+            lines.append(f"truenas_exporter_request_duration_seconds_sum{{{labels}}} {hist[-2]:.6f}")
+            lines.append(f"truenas_exporter_request_duration_seconds_count{{{labels}}} {hist[-1]}")
+
+        lines.append("# HELP truenas_exporter_request_errors_total TrueNAS API request errors by type")
+        lines.append("# TYPE truenas_exporter_request_errors_total counter")
+        for (host, endpoint, kind), count in sorted(errors.items()):
+            labels = f'host="{escape_label_value(host)}",endpoint="{endpoint}",type="{kind}"'
+            lines.append(f"truenas_exporter_request_errors_total{{{labels}}} {count}")
+
+        lines.append("# HELP truenas_exporter_response_size_bytes Payload size of the last API response")
+        lines.append("# TYPE truenas_exporter_response_size_bytes gauge")
+        for (host, endpoint), value in sorted(size.items()):
+            lines.append(f'truenas_exporter_response_size_bytes{{host="{escape_label_value(host)}",endpoint="{endpoint}"}} {value}')
+        lines.append("# HELP truenas_exporter_response_bytes_total Payload bytes received from the API")
+        lines.append("# TYPE truenas_exporter_response_bytes_total counter")
+        for (host, endpoint), value in sorted(bytes_total.items()):
+            lines.append(f'truenas_exporter_response_bytes_total{{host="{escape_label_value(host)}",endpoint="{endpoint}"}} {value}')
+
+        lines.append("# HELP truenas_exporter_series Series emitted by the collector in the last render")
+        lines.append("# TYPE truenas_exporter_series gauge")
+        for collector, count in series.items():
+            lines.append(f'truenas_exporter_series{{collector="{collector}"}} {count}')
+
+        lines.append("# HELP truenas_exporter_render_duration_seconds Time to render the last exposition")
+        lines.append("# TYPE truenas_exporter_render_duration_seconds gauge")
+        if render_seconds is not None:
+            lines.append(f"truenas_exporter_render_duration_seconds {render_seconds:.6f}")
+
+        return lines
+
+
+SELF_METRICS = SelfMetrics()
+
+
+def make_ssl_context(verify):
+    """Build an SSL context (loads the CA bundle, so do it once)."""
     ssl_context = ssl.create_default_context()
-    if not target.get("verify_ssl", False):
+    if not verify:
         ssl_context.check_hostname = False
         ssl_context.verify_mode = ssl.CERT_NONE
+    return ssl_context
 
-    req = urllib.request.Request(
-        url,
-        headers={
-            "Authorization": f"Bearer {target['api_token']}",
-            "Content-Type": "application/json",
-        },
-    )
 
+# One context per verification mode, shared by every connection
+SSL_CONTEXTS = {True: make_ssl_context(True), False: make_ssl_context(False)}
+
+
+class RedirectError(http.client.HTTPException):
+    """A redirect the connection pool does not follow."""
+
+    def __init__(self, status, location, why):
+        super().__init__(f"HTTP {status} redirect to {location!r} not followed ({why}); "
+                         "point api_url at the final address")
+        self.status = status
+        self.location = location
+
+
+class ConnectionPool:
+    """
+    Keep-alive connections to one TrueNAS host.
+
+    Idle connections are kept on a stack and reused. A request that fails on
+    a reused connection (the NAS may have closed it while idle) is retried
+    once on a fresh one; any failed connection is discarded. Up to
+    MAX_REDIRECTS redirects to the same scheme, host and port are followed;
+    others (an http api_url redirected to https, say) raise RedirectError
+    naming the Location, so the API token is never sent to another origin.
+    """
+
+    def __init__(self, api_url, verify_ssl=False, timeout=API_TIMEOUT,
+                 max_idle=MAX_IDLE_CONNECTIONS):
+        parts = urllib.parse.urlsplit(api_url)
+        self.https = parts.scheme != "http"
+        self.host = parts.hostname
+        self.port = parts.port
+        self.base_path = parts.path.rstrip("/")
+        self.origin = f"{parts.scheme}://{parts.netloc}"
+        self.ssl_context = SSL_CONTEXTS[bool(verify_ssl)]
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self.https:
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout,
+                                               context=self.ssl_context)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _release(self, conn):
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def request(self, path, headers, timeout=None):
+        """GET base_path + path. Returns (status, reason, body bytes)."""
+        default_port = 443 if self.https else 80
+        origin = ("https" if self.https else "http", self.host, self.port or default_port)
+        url = self.origin + self.base_path + path
+        for _ in range(MAX_REDIRECTS + 1):
+            parts = urllib.parse.urlsplit(url)
+            target = parts.path + (f"?{parts.query}" if parts.query else "")
+            status, reason, body, location = self._get(target, headers, timeout)
+            if status not in (301, 302, 303, 307, 308):
+                return status, reason, body
+            if not location:
+                raise RedirectError(status, location, "no Location header")
+            url = urllib.parse.urljoin(url, location)
+            parts = urllib.parse.urlsplit(url)
+            if (parts.scheme, parts.hostname, parts.port or default_port) != origin:
+                raise RedirectError(status, location, "different host or scheme")
+        raise RedirectError(status, location, f"more than {MAX_REDIRECTS} redirects")
+
+    def _get(self, target, headers, timeout):
+        """One GET on a pooled connection: (status, reason, body, Location)."""
+        for attempt in range(2):
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            reused = conn is not None
+            if conn is None:
+                conn = self._connect()
+            conn.timeout = timeout or self.timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(conn.timeout)
+            try:
+                conn.request("GET", target, headers=headers)
+                resp = conn.getresponse()
+                body = resp.read()
+            except Exception as e:
+                conn.close()
+                if reused and attempt == 0 and not isinstance(e, TimeoutError):
+                    continue
+                raise
+            if resp.will_close:
+                conn.close()
+            else:
+                self._release(conn)
+            return resp.status, resp.reason, body, resp.getheader("Location")
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(target):
+    """The connection pool of a target, created on first use."""
+    key = (target["name"], target["api_url"])
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(target["api_url"],
+                                                target.get("verify_ssl", False))
+    return pool
+
+
+def endpoint_unavailable(error):
+    """
+    True if an error only means this TrueNAS version lacks the endpoint
+    (REST 404, JSON-RPC method not found), e.g. virt/instance before 25.04.
+    """
+    return error is not None and (error.startswith("HTTP Error 404")
+                                  or "Method not found" in error)
+
+
+def fetch_api(target, endpoint, timeout=API_TIMEOUT):
+    """Fetch data from TrueNAS API endpoint."""
+    headers = {
+        "Authorization": f"Bearer {target['api_token']}",
+        "Content-Type": "application/json",
+    }
+
+    start = time.monotonic()
+    size = error_type = None
     try:
-        with urllib.request.urlopen(req, timeout=10, context=ssl_context) as resp:
-            return json.loads(resp.read().decode("utf-8")), None
-    except (URLError, HTTPError) as e:
+        status, reason, body = get_pool(target).request(f"/api/v2.0/{endpoint}", headers, timeout)
+        size = len(body)
+        if status >= 400:
+            error_type = f"http_{status}"
+            return None, f"HTTP Error {status}: {reason}"
+        try:
+            return json.loads(body.decode("utf-8")), None
+        except ValueError as e:
+            error_type = "json"
+            return None, str(e)
+    except TimeoutError:
+        error_type = "timeout"
+        return None, TIMED_OUT
+    except RedirectError as e:
+        error_type = f"http_{e.status}"
+        return None, str(e)
+    except ssl.SSLError as e:
+        error_type = "tls"
+        return None, str(e)
+    except (OSError, http.client.HTTPException) as e:
+        error_type = "connection"
         return None, str(e)
     except Exception as e:
+        error_type = "other"
         return None, str(e)
+    finally:
+        # Label by collector name ("virt/instance" -> "virt")
+        SELF_METRICS.observe_request(target["name"], endpoint.split("/")[0],
+                                     time.monotonic() - start, size, error_type)
 
 
-def fetch_replication_tasks(target):
+def fetch_replication_tasks(target, timeout=API_TIMEOUT):
     """Fetch replication tasks from TrueNAS API."""
-    return fetch_api(target, "replication")
+    return fetch_api(target, "replication", timeout)
 
 
-def fetch_pools(target):
+def fetch_pools(target, timeout=API_TIMEOUT):
     """Fetch pools from TrueNAS API."""
-    return fetch_api(target, "pool")
+    return fetch_api(target, "pool", timeout)
 
 
-def fetch_apps(target):
+def fetch_apps(target, timeout=API_TIMEOUT):
     """Fetch apps from TrueNAS API."""
-    return fetch_api(target, "app")
+    return fetch_api(target, "app", timeout)
 
 
-def fetch_vms(target):
+def fetch_vms(target, timeout=API_TIMEOUT):
     """Fetch VMs from TrueNAS API."""
-    return fetch_api(target, "vm")
+    return fetch_api(target, "vm", timeout)
 
 
-def fetch_virt_instances(target):
+def fetch_virt_instances(target, timeout=API_TIMEOUT):
     """Fetch Incus containers/VMs from TrueNAS 25.04+ API."""
-    return fetch_api(target, "virt/instance")
+    return fetch_api(target, "virt/instance", timeout)
+
+
+# Endpoints collected per target
+ENDPOINTS = {
+    "replication": fetch_replication_tasks,
+    "pool": fetch_pools,
+    "app": fetch_apps,
+    "vm": fetch_vms,
+    "virt": fetch_virt_instances,
+}
+
+
+def fetch_all(targets, executor, limits=None, pairs=None, deadline=None,
+              budgets=None, timings=None, late=None):
+    """
+    Fetch every (target, endpoint) pair, or only the given (target, endpoint)
+    pairs, on the executor.
+
+    Each target's pairs are worked off by a few chains that fetch one pair
+    after another: one chain per slot of limits[name] (a semaphore) free at
+    submission, so pool threads never wait on a busy target. A target with
+    no free slot reports TARGET_BUSY.
+    A target's budgets[name] seconds run from its first request, not from
+    when its pairs were queued; a pair that would start after the budget is
+    used up is skipped, and each request's timeout is cut to the budget (and
+    deadline) left. With a deadline (seconds from the call), pairs not
+    finished when it expires are reported as DEADLINE_EXCEEDED and handed to
+    late(key, result) once they finish (or are skipped). Seconds from the
+    target's first request to each pair's completion go into timings.
+    Returns {(target name, endpoint): (data, error)}.
+    """
+    limits = limits or {}
+    budgets = budgets or {}
+    if timings is None:
+        timings = {}
+    started = time.monotonic()
+    lock = threading.Lock()
+    finished = {}
+    clocks = {}
+    expired = False
+
+    def fetch_one(target, endpoint):
+        name = target["name"]
+        begun = clocks.setdefault(name, time.monotonic())
+        try:
+            timeout = API_TIMEOUT
+            if deadline is not None:
+                left = deadline - (time.monotonic() - started)
+                if left <= 0:
+                    return None, DEADLINE_EXCEEDED
+                timeout = min(timeout, left)
+            budget = budgets.get(name)
+            if budget is not None:
+                left = budget - (time.monotonic() - begun)
+                if left <= 0:
+                    return None, BUDGET_EXCEEDED
+                timeout = min(timeout, left)
+            return ENDPOINTS[endpoint](target, timeout)
+        finally:
+            timings[(name, endpoint)] = time.monotonic() - begun
+
+    def finish(key, result):
+        with lock:
+            if not expired:
+                finished[key] = result
+                return
+        if late is not None:
+            late(key, result)
+
+    def chain(target, endpoints, sem):
+        try:
+            while True:
+                with lock:
+                    if not endpoints:
+                        return
+                    endpoint = endpoints.pop(0)
+                finish((target["name"], endpoint), fetch_one(target, endpoint))
+        finally:
+            if sem is not None:
+                sem.release()
+
+    if pairs is None:
+        pairs = [(t, e) for t in targets for e in ENDPOINTS]
+
+    by_target = {}
+    for t, e in pairs:
+        by_target.setdefault(t["name"], (t, []))[1].append(e)
+    futures = []
+    for name, (target, endpoints) in by_target.items():
+        sem = limits.get(name)
+        if sem is None:
+            width = min(len(endpoints), DEFAULT_MAX_CONCURRENCY_PER_TARGET)
+        else:
+            width = 0
+            while width < len(endpoints) and sem.acquire(blocking=False):
+                width += 1
+        if width == 0:
+            # Earlier calls still hold every slot (a hung NAS)
+            for endpoint in endpoints:
+                finished[(name, endpoint)] = (None, TARGET_BUSY)
+            continue
+        futures.extend(executor.submit(chain, target, endpoints, sem) for _ in range(width))
+    concurrent.futures.wait(futures, timeout=deadline)
+    with lock:
+        expired = True
+        results = dict(finished)
+    for t, e in pairs:
+        key = (t["name"], e)
+        if key not in results:
+            results[key] = (None, DEADLINE_EXCEEDED)
+            begun = clocks.get(key[0])
+            timings[key] = 0.0 if begun is None else time.monotonic() - begun
+    return results
+
+
+# Subscribe mode: JSON-RPC query method (and event collection) per endpoint
+SUBSCRIPTIONS = {
+    "replication": "replication.query",
+    "pool": "pool.query",
+    "app": "app.query",
+    "vm": "vm.query",
+    "virt": "virt.instance.query",
+}
+# Endpoints re-queried on a timer instead of relying on collection events
+REQUERY_ENDPOINTS = {"replication"}
+# Finished jobs that trigger a re-query of an endpoint
+JOB_RELOADS = {"replication.run": "replication"}
+JOB_FINISHED_STATES = {"SUCCESS", "FAILED", "ABORTED"}
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+class WebSocket:
+    """
+    Minimal RFC 6455 client: text messages, masked client frames, ping/pong
+    and fragmented messages. Not thread-safe; one reader and writer.
+
+    Received bytes are buffered and frames are only consumed once complete,
+    so a socket timeout in recv() leaves the stream intact and can be retried.
+    """
+
+    def __init__(self, url, ssl_context=None, timeout=API_TIMEOUT):
+        parts = urllib.parse.urlsplit(url)
+        secure = parts.scheme == "wss"
+        host = parts.hostname
+        port = parts.port or (443 if secure else 80)
+        sock = socket.create_connection((host, port), timeout=timeout)
+        if secure:
+            sock = ssl_context.wrap_socket(sock, server_hostname=host)
+        self.sock = sock
+        self._buf = bytearray()
+        self._fragments = []
+
+        key = base64.b64encode(os.urandom(16)).decode("ascii")
+        sock.sendall(
+            f"GET {parts.path or '/'} HTTP/1.1\r\n"
+            f"Host: {parts.netloc}\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\n"
+            "Sec-WebSocket-Version: 13\r\n\r\n".encode("ascii")
+        )
+        while b"\r\n\r\n" not in self._buf:
+            self._fill()
+        head, _, rest = bytes(self._buf).partition(b"\r\n\r\n")
+        self._buf = bytearray(rest)
+        status, *header_lines = head.decode("latin-1").split("\r\n")
+        if status.split(" ", 2)[1:2] != ["101"]:
+            raise ConnectionError(f"WebSocket upgrade refused: {status}")
+        headers = {}
+        for line in header_lines:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode("ascii")).digest()).decode("ascii")
+        if headers.get("sec-websocket-accept") != accept:
+            raise ConnectionError("WebSocket upgrade: bad Sec-WebSocket-Accept")
+
+    def _fill(self):
+        chunk = self.sock.recv(65536)
+        if not chunk:
+            raise ConnectionError("WebSocket closed by peer")
+        self._buf += chunk
+
+    def _send_frame(self, opcode, payload):
+        header = bytearray([0x80 | opcode])
+        n = len(payload)
+        if n < 126:
+            header.append(0x80 | n)
+        elif n < 65536:
+            header.append(0x80 | 126)
+            header += struct.pack("!H", n)
+        else:
+            header.append(0x80 | 127)
+            header += struct.pack("!Q", n)
+        mask = os.urandom(4)
+        header += mask
+        if n:
+            key = int.from_bytes((mask * (n // 4 + 1))[:n], "big")
+            payload = (int.from_bytes(payload, "big") ^ key).to_bytes(n, "big")
+        self.sock.sendall(bytes(header) + payload)
+
+    def _parse_frame(self):
+        """Pop one complete frame off the buffer: (fin, opcode, payload) or None."""
+        buf = self._buf
+        if len(buf) < 2:
+            return None
+        fin, opcode = buf[0] & 0x80, buf[0] & 0x0F
+        masked, n = buf[1] & 0x80, buf[1] & 0x7F
+        pos = 2
+        if n == 126:
+            if len(buf) < 4:
+                return None
+            n = struct.unpack_from("!H", buf, 2)[0]
+            pos = 4
+        elif n == 127:
+            if len(buf) < 10:
+                return None
+            n = struct.unpack_from("!Q", buf, 2)[0]
+            pos = 10
+        mask = None
+        if masked:
+            if len(buf) < pos + 4:
+                return None
+            mask = bytes(buf[pos:pos + 4])
+            pos += 4
+        if len(buf) < pos + n:
+            return None
+        payload = bytes(buf[pos:pos + n])
+        del buf[:pos + n]
+        if mask and n:
+            key = int.from_bytes((mask * (n // 4 + 1))[:n], "big")
+            payload = (int.from_bytes(payload, "big") ^ key).to_bytes(n, "big")
+        return fin, opcode, payload
+
+    def send(self, text):
+        self._send_frame(0x1, text.encode("utf-8"))
+
+    def ping(self):
+        self._send_frame(0x9, b"")
+
+    def recv(self):
+        """Next text message. Raises socket.timeout after the socket timeout."""
+        while True:
+            frame = self._parse_frame()
+            if frame is None:
+                self._fill()
+                continue
+            fin, opcode, payload = frame
+            if opcode == 0x8:
+                raise ConnectionError("WebSocket closed by peer")
+            if opcode == 0x9:
+                self._send_frame(0xA, payload)
+                continue
+            if opcode == 0xA:
+                continue
+            self._fragments.append(payload)
+            if fin:
+                message = b"".join(self._fragments)
+                self._fragments = []
+                return message.decode("utf-8")
+
+    def close(self):
+        try:
+            self._send_frame(0x8, b"")
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class RPCError(Exception):
+    """Error response to a JSON-RPC call."""
+
+
+class Subscriber:
+    """
+    Push-based model of one target over the middleware WebSocket API.
+
+    A daemon thread keeps one connection open: it logs in with the API key,
+    subscribes to the SUBSCRIPTIONS collections (and core.get_jobs), loads
+    each with its query method, then applies collection_update events as they
+    arrive. Lost connections are retried with exponential backoff; the last
+    model is kept (and ages) meanwhile.
+    """
+
+    def __init__(self, target, refresh):
+        self.target = target
+        self.refresh = refresh
+        parts = urllib.parse.urlsplit(target["api_url"])
+        scheme = "ws" if parts.scheme == "http" else "wss"
+        self.url = f"{scheme}://{parts.netloc}{parts.path.rstrip('/')}{target.get('ws_path', DEFAULT_WS_PATH)}"
+        self.ssl_context = SSL_CONTEXTS[bool(target.get("verify_ssl", False))]
+        self._lock = threading.Lock()
+        self._models = {}                                   # endpoint -> {id: object}
+        self._errors = {e: "not connected" for e in SUBSCRIPTIONS}
+        self.live = False
+        self.live_at = {}                                   # endpoint -> last time known current
+        self.version = 0
+        self._next_id = 0
+        self._reload = set()
+        self._requery = {}                                  # endpoint -> next re-query time
+        self._synced = False
+
+    def start(self):
+        threading.Thread(target=self.run, name=f"subscribe-{self.target['name']}", daemon=True).start()
+
+    def run(self):
+        backoff = 1
+        while True:
+            try:
+                self._session()
+            except Exception as e:
+                logger.warning("Subscription to %s lost: %s", self.target["name"], e)
+            if self._synced:
+                backoff = 1
+            time.sleep(backoff)
+            backoff = min(backoff * 2, SUBSCRIBE_MAX_BACKOFF)
+
+    def _call(self, ws, method, params):
+        """Send a JSON-RPC request and return its result, applying events meanwhile."""
+        self._next_id += 1
+        call_id = self._next_id
+        ws.send(json.dumps({"jsonrpc": "2.0", "id": call_id, "method": method, "params": params}))
+        while True:
+            msg = json.loads(ws.recv())
+            if msg.get("id") == call_id:
+                if msg.get("error") is not None:
+                    error = msg["error"]
+                    raise RPCError(error.get("message", str(error)) if isinstance(error, dict) else str(error))
+                return msg.get("result")
+            self._handle(msg)
+
+    def _load(self, ws, endpoint):
+        start = time.monotonic()
+        try:
+            objects = self._call(ws, SUBSCRIPTIONS[endpoint], [])
+            model, error = {obj.get("id", i): obj for i, obj in enumerate(objects or [])}, None
+        except RPCError as e:
+            model, error = {}, str(e)
+        SELF_METRICS.observe_request(self.target["name"], endpoint, time.monotonic() - start,
+                                     error=None if error is None else "rpc")
+        with self._lock:
+            self._models[endpoint] = model
+            self._errors[endpoint] = error
+            self.live_at[endpoint] = time.time()
+            self.version += 1
+
+    def _handle(self, msg):
+        if msg.get("method") != "collection_update":
+            return
+        params = msg.get("params") or {}
+        collection = params.get("collection")
+        fields = params.get("fields") or {}
+        if collection == "core.get_jobs":
+            endpoint = JOB_RELOADS.get(fields.get("method"))
+            if endpoint and fields.get("state") in JOB_FINISHED_STATES:
+                self._reload.add(endpoint)
+            return
+        endpoint = next((e for e, m in SUBSCRIPTIONS.items() if m == collection), None)
+        if endpoint is None:
+            return
+        kind, obj_id = params.get("msg"), params.get("id")
+        with self._lock:
+            model = self._models.setdefault(endpoint, {})
+            if kind == "removed":
+                model.pop(obj_id, None)
+            elif kind == "added":
+                model[obj_id] = fields
+            elif kind == "changed":
+                obj = model.setdefault(obj_id, {"id": obj_id})
+                obj.update(fields)
+                for key in params.get("cleared") or []:
+                    obj.pop(key, None)
+            self.version += 1
+
+    def _session(self):
+        self._synced = False
+        ws = WebSocket(self.url, self.ssl_context)
+        requery = self._requery = {e: 0 for e in REQUERY_ENDPOINTS}
+        try:
+            if not self._call(ws, "auth.login_with_api_key", [self.target["api_token"]]):
+                raise PermissionError("API key rejected")
+            for endpoint, collection in SUBSCRIPTIONS.items():
+                if endpoint in requery:
+                    continue
+                try:
+                    self._call(ws, "core.subscribe", [collection])
+                except RPCError as e:
+                    # No event source on this version: poll it over the socket
+                    logger.info("%s: cannot subscribe to %s (%s), re-querying instead",
+                                self.target["name"], collection, e)
+                    requery[endpoint] = 0
+            try:
+                self._call(ws, "core.subscribe", ["core.get_jobs"])
+            except RPCError as e:
+                logger.info("%s: cannot subscribe to core.get_jobs (%s)", self.target["name"], e)
+            for endpoint in SUBSCRIPTIONS:
+                if endpoint not in requery:
+                    self._load(ws, endpoint)
+            with self._lock:
+                self.live = True
+                self.version += 1
+            self._synced = True
+            logger.info("Subscribed to %s", self.target["name"])
+
+            while True:
+                # RPCs get the full timeout; only the event wait below is shorter
+                ws.sock.settimeout(API_TIMEOUT)
+                now = time.time()
+                # events handled during these loads may queue further reloads
+                pending, self._reload = self._reload, set()
+                for endpoint in sorted(pending | {e for e, at in requery.items() if at <= now}):
+                    self._load(ws, endpoint)
+                    if endpoint in requery:
+                        requery[endpoint] = time.time() + self.refresh[endpoint]
+                if self._reload:
+                    continue
+                wait = min([SUBSCRIBE_IDLE_SECONDS] + [at - time.time() for at in requery.values()])
+                ws.sock.settimeout(max(0.1, wait))
+                try:
+                    message = ws.recv()
+                except socket.timeout:
+                    if wait >= SUBSCRIBE_IDLE_SECONDS:
+                        # Quiet socket: make sure the middleware is still there
+                        ws.sock.settimeout(API_TIMEOUT)
+                        self._call(ws, "core.ping", [])
+                    continue
+                self._handle(json.loads(message))
+        finally:
+            with self._lock:
+                if self.live:
+                    # Event-driven models were current until now
+                    now = time.time()
+                    for endpoint in SUBSCRIPTIONS:
+                        if endpoint not in requery and endpoint in self._models:
+                            self.live_at[endpoint] = now
+                    self.live = False
+                    self.version += 1
+            ws.close()
+
+    def snapshot(self):
+        """{endpoint: (data, error)} in the shape fetch_all() returns."""
+        with self._lock:
+            return {
+                e: (list(self._models.get(e, {}).values()), None) if self._errors[e] is None
+                else (None, self._errors[e])
+                for e in SUBSCRIPTIONS
+            }
+
+    def ok_at(self, now):
+        """{endpoint: time the model was last known current}."""
+        with self._lock:
+            return {
+                e: now if self.live and e not in self._requery else t
+                for e, t in self.live_at.items() if self._errors.get(e) is None
+            }
 
 
 def parse_cron_to_seconds(schedule):
@@ -361,7 +1171,7 @@ def escape_label_value(value):
     return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
 
 
-def generate_replication_metrics(targets):
+def generate_replication_metrics(targets, results):
     """Generate Prometheus metrics for replication tasks."""
     lines = []
 
@@ -383,7 +1193,7 @@ def generate_replication_metrics(targets):
 
     for target in targets:
         host = escape_label_value(target["name"])
-        tasks, error = fetch_replication_tasks(target)
+        tasks, error = results[(target["name"], "replication")]
 
         if error or tasks is None:
             # API unreachable
@@ -463,7 +1273,7 @@ def generate_replication_metrics(targets):
     return lines
 
 
-def generate_pool_metrics(targets):
+def generate_pool_metrics(targets, results):
     """Generate Prometheus metrics for pool capacity."""
     lines = []
 
@@ -478,7 +1288,7 @@ def generate_pool_metrics(targets):
 
     for target in targets:
         host = escape_label_value(target["name"])
-        pools, error = fetch_pools(target)
+        pools, error = results[(target["name"], "pool")]
 
         if error or pools is None:
             logger.warning("Failed to fetch pools from %s: %s", host, error)
@@ -506,7 +1316,7 @@ def generate_pool_metrics(targets):
     return lines
 
 
-def generate_app_metrics(targets):
+def generate_app_metrics(targets, results):
     """Generate Prometheus metrics for TrueNAS apps."""
     lines = []
 
@@ -518,7 +1328,7 @@ def generate_app_metrics(targets):
 
     for target in targets:
         host = escape_label_value(target["name"])
-        apps, error = fetch_apps(target)
+        apps, error = results[(target["name"], "app")]
 
         if error or apps is None:
             # API error - skip apps for this host
@@ -546,7 +1356,7 @@ def generate_app_metrics(targets):
     return lines
 
 
-def generate_vm_metrics(targets):
+def generate_vm_metrics(targets, results):
     """Generate Prometheus metrics for TrueNAS VMs."""
     lines = []
 
@@ -558,7 +1368,7 @@ def generate_vm_metrics(targets):
 
     for target in targets:
         host = escape_label_value(target["name"])
-        vms, error = fetch_vms(target)
+        vms, error = results[(target["name"], "vm")]
 
         if error or vms is None:
             # API error - skip VMs for this host
@@ -592,7 +1402,7 @@ def generate_vm_metrics(targets):
     return lines
 
 
-def generate_virt_metrics(targets):
+def generate_virt_metrics(targets, results):
     """Generate Prometheus metrics for TrueNAS Incus instances (containers/VMs)."""
     lines = []
 
@@ -604,7 +1414,7 @@ def generate_virt_metrics(targets):
 
     for target in targets:
         host = escape_label_value(target["name"])
-        instances, error = fetch_virt_instances(target)
+        instances, error = results[(target["name"], "virt")]
 
         if error or instances is None:
             # API error or not available (older TrueNAS) - skip
@@ -639,37 +1449,474 @@ def generate_virt_metrics(targets):
     return lines
 
 
-def generate_metrics(targets):
-    """Generate all Prometheus metrics."""
+# Metric generators; each renders the endpoint of the same name
+COLLECTORS = {
+    "replication": generate_replication_metrics,
+    "pool": generate_pool_metrics,
+    "app": generate_app_metrics,
+    "vm": generate_vm_metrics,
+    "virt": generate_virt_metrics,
+}
+
+
+def generate_sections(targets, results, collectors=None, observe=True):
+    """
+    Render each (selected) collector's metrics: {collector: exposition text}.
+    With observe, series counts and render time go to SELF_METRICS.
+    """
+    start = time.perf_counter()
+    sections = {}
+    series = {}
+    for collector, generate in COLLECTORS.items():
+        if collectors is not None and collector not in collectors:
+            continue
+        lines = generate(targets, results)
+        series[collector] = sum(1 for line in lines if not line.startswith("#"))
+        sections[collector] = "\n".join(lines) + "\n"
+    if observe:
+        SELF_METRICS.observe_render(series, time.perf_counter() - start)
+    return sections
+
+
+def generate_exporter_metrics(targets, refresh, now, ok_at, subscribed=None, stale=None,
+                              durations=None, collectors=None):
+    """Generate exporter metrics: cache freshness, staleness and collection timing."""
     lines = []
-    lines.extend(generate_replication_metrics(targets))
-    lines.extend(generate_pool_metrics(targets))
-    lines.extend(generate_app_metrics(targets))
-    lines.extend(generate_vm_metrics(targets))
-    lines.extend(generate_virt_metrics(targets))
-    return "\n".join(lines) + "\n"
+    endpoints = [e for e in ENDPOINTS if collectors is None or e in collectors]
+
+    lines.append("# HELP truenas_exporter_cache_age_seconds Seconds since the endpoint was last fetched successfully")
+    lines.append("# TYPE truenas_exporter_cache_age_seconds gauge")
+    for target in targets:
+        host = escape_label_value(target["name"])
+        for endpoint in endpoints:
+            fetched = ok_at.get((target["name"], endpoint))
+            if fetched is not None:
+                labels = f'host="{host}",endpoint="{endpoint}"'
+                lines.append(f"truenas_exporter_cache_age_seconds{{{labels}}} {now - fetched:.1f}")
+
+    lines.append("# HELP truenas_exporter_refresh_interval_seconds Configured refresh interval of the endpoint")
+    lines.append("# TYPE truenas_exporter_refresh_interval_seconds gauge")
+    for endpoint in endpoints:
+        lines.append(f'truenas_exporter_refresh_interval_seconds{{endpoint="{endpoint}"}} {refresh[endpoint]}')
+
+    if subscribed:
+        lines.append("# HELP truenas_exporter_subscription_up 1 if the WebSocket subscription to the target is live")
+        lines.append("# TYPE truenas_exporter_subscription_up gauge")
+        for name, live in subscribed.items():
+            lines.append(f'truenas_exporter_subscription_up{{host="{escape_label_value(name)}"}} {1 if live else 0}')
+
+    stale = stale or set()
+    lines.append("# HELP truenas_exporter_stale 1 if some of the target's data are last good values from an earlier collection")
+    lines.append("# TYPE truenas_exporter_stale gauge")
+    for target in targets:
+        host = escape_label_value(target["name"])
+        lines.append(f'truenas_exporter_stale{{host="{host}"}} {1 if target["name"] in stale else 0}')
+
+    lines.append("# HELP truenas_exporter_collect_duration_seconds Duration of the target's last collection")
+    lines.append("# TYPE truenas_exporter_collect_duration_seconds gauge")
+    for target in targets:
+        duration = (durations or {}).get(target["name"])
+        if duration is not None:
+            host = escape_label_value(target["name"])
+            lines.append(f'truenas_exporter_collect_duration_seconds{{host="{host}"}} {duration:.3f}')
+
+    return lines
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls.
+
+    While do(key, fn) is running, other callers of do() with the same key wait
+    for it and share its result (or exception) instead of calling fn again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {"done": threading.Event(), "result": None, "error": None}
+        if not leader:
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+        try:
+            call["result"] = fn()
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["done"].set()
+        return call["result"]
+
+
+class Collector:
+    """Background collection loop.
+
+    Wakes every `interval` seconds (the shortest refresh interval) on its own
+    thread, refetches only the (target, endpoint) pairs whose refresh interval
+    has elapsed, and re-renders the exposition from the cached results, so a
+    scrape only copies bytes. A slow or unreachable NAS delays the next
+    refresh, never a scrape. API calls go through a shared thread pool with a
+    per-target concurrency limit.
+
+    Targets with a Subscriber are never polled: their results come from the
+    subscriber's model, and a scrape re-renders when that model has changed.
+    Probed targets are not collected in the background at all; probe()
+    fetches them on demand.
+    """
+
+    def __init__(self, targets, refresh, max_workers=DEFAULT_MAX_WORKERS,
+                 per_target=DEFAULT_MAX_CONCURRENCY_PER_TARGET, subscribers=None,
+                 deadline=DEFAULT_COLLECT_DEADLINE, budget=DEFAULT_TARGET_BUDGET, probed=None):
+        self.targets = targets
+        self.by_name = {t["name"]: t for t in targets}
+        self.probed = set(probed or ())
+        self.collected = [t for t in targets if t["name"] not in self.probed]
+        self.refresh = refresh
+        self.deadline = deadline
+        self.budgets = {t["name"]: float(t.get("budget", budget)) for t in targets}
+        self.subscribers = subscribers or {}
+        self.polled = [t for t in self.collected if t["name"] not in self.subscribers]
+        self._rendered_version = None
+        self.interval = min(refresh.values())
+        self._lock = threading.Lock()
+        self._sections = None  # collector -> rendered exposition bytes
+        self._render_lock = threading.Lock()
+        self._results = {}   # (name, endpoint) -> (data, error) of the last fetch
+        self._fetched = {}   # (name, endpoint) -> start of the last fetch
+        self._ok_at = {}     # (name, endpoint) -> time of the last successful fetch
+        self._good = {}      # (name, endpoint) -> last successful (data, None)
+        self._stale = set()  # (name, endpoint) served from _good after a timeout
+        self._inflight = set()  # pairs still running past a deadline
+        self._late = {}      # (name, endpoint) -> (result, time) finished past a deadline
+        self._durations = {}  # name -> seconds of its last collection
+        self.flight = SingleFlight()
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="fetch")
+        self.limits = {
+            t["name"]: threading.BoundedSemaphore(int(t.get("max_concurrency", per_target)))
+            for t in targets
+        }
+
+    def due(self, now):
+        """(target, endpoint) pairs whose refresh interval has elapsed."""
+        return [
+            (t, e) for t in self.polled for e in ENDPOINTS
+            if (t["name"], e) not in self._inflight
+            and now - self._fetched.get((t["name"], e), 0) >= self.refresh[e] - REFRESH_SLACK
+        ]
+
+    def collect_once(self):
+        """Refresh due endpoints, joining a collection already in flight."""
+        return self.flight.do("collect", self._collect)
+
+    def _on_late(self, key, result):
+        with self._lock:
+            self._late[key] = (result, time.time())
+            self._inflight.discard(key)
+
+    def _store(self, key, result, at, ok):
+        """Cache a fetch result, falling back to the last good one after a timeout."""
+        data, error = result
+        with self._lock:
+            if error is None:
+                self._results[key] = self._good[key] = result
+                self._stale.discard(key)
+                ok[key] = at
+            elif error in TIMEOUT_ERRORS and key in self._good:
+                self._results[key] = self._good[key]
+                self._stale.add(key)
+            else:
+                self._results[key] = result
+                self._stale.discard(key)
+
+    def _collect(self):
+        start = time.time()
+        ok = {}
+        with self._lock:
+            late, self._late = self._late, {}
+        for key, (result, at) in late.items():
+            self._store(key, result, at, ok)
+        pairs = self.due(start)
+        timings = {}
+        results = fetch_all(self.polled, self.executor, self.limits, pairs,
+                            deadline=self.deadline, budgets=self.budgets,
+                            timings=timings, late=self._on_late)
+        done = time.time()
+        durations = {}
+        for key, result in results.items():
+            self._fetched[key] = start
+            if result[1] == DEADLINE_EXCEEDED:
+                with self._lock:
+                    if key not in self._late:
+                        self._inflight.add(key)
+            self._store(key, result, done, ok)
+            elapsed = timings.get(key, 0.0)
+            durations[key[0]] = max(durations.get(key[0], 0.0), elapsed)
+        with self._lock:
+            self._ok_at.update(ok)
+            self._durations.update(durations)
+        sections = self._render()
+        logger.debug("Refreshed %d endpoint(s), rendered %d bytes in %.2fs",
+                     len(pairs), sum(len(b) for b in sections.values()), time.time() - start)
+
+    def _render(self):
+        """Re-render the sections from the cached results and subscriber models."""
+        with self._render_lock:
+            version = self._subscribers_version()
+            snapshots = {name: sub.snapshot() for name, sub in self.subscribers.items()}
+            with self._lock:
+                for name, snapshot in snapshots.items():
+                    for endpoint, result in snapshot.items():
+                        self._results[(name, endpoint)] = result
+                results = dict(self._results)
+            sections = {
+                collector: text.encode("utf-8")
+                for collector, text in generate_sections(self.collected, results).items()
+            }
+            with self._lock:
+                self._sections = sections
+                self._rendered_version = version
+            return sections
+
+    def run(self):
+        while True:
+            start = time.time()
+            try:
+                self.collect_once()
+            except Exception as e:
+                logger.error("Collection failed: %s", e)
+            time.sleep(max(0.0, self.interval - (time.time() - start)))
+
+    def start(self):
+        for sub in self.subscribers.values():
+            sub.start()
+        threading.Thread(target=self.run, name="collector", daemon=True).start()
+
+    def _subscribers_version(self):
+        return tuple(sub.version for sub in self.subscribers.values())
+
+    def _current(self):
+        """
+        Current sections. Before the first collection, joins or starts one;
+        when a subscriber model has changed since, re-renders from cache
+        (polling is left to the background loop).
+        """
+        with self._lock:
+            sections = self._sections
+            stale = self._rendered_version != self._subscribers_version()
+        try:
+            if sections is None:
+                self.collect_once()
+            elif stale:
+                self.flight.do("render", self._render)
+        except Exception as e:
+            logger.error("Collection failed: %s", e)
+        with self._lock:
+            return self._sections
+
+    def _exporter_lines(self, targets, collectors):
+        """Exporter metrics of the given collected targets, current at call time."""
+        names = {t["name"] for t in targets}
+        with self._lock:
+            ok_at = {k: v for k, v in self._ok_at.items() if k[0] in names}
+            durations = {k: v for k, v in self._durations.items() if k in names}
+            stale = {name for name, _ in self._stale if name in names}
+        now = time.time()
+        subscribed = {name: sub.live for name, sub in self.subscribers.items() if name in names}
+        for name in subscribed:
+            for endpoint, at in self.subscribers[name].ok_at(now).items():
+                ok_at[(name, endpoint)] = at
+        stale |= {name for name, live in subscribed.items() if not live}
+        return generate_exporter_metrics(targets, self.refresh, now, ok_at, subscribed,
+                                         stale, durations, collectors)
+
+    def exposition(self, collectors=None):
+        """
+        Last rendered exposition, of all collectors or only the named ones.
+        Before the first collection has finished, waits for it (joining the
+        one in flight).
+
+        Cache ages are rendered per call so they are current at scrape time.
+        """
+        sections = self._current()
+        if sections is None:
+            return None
+        body = b"".join(b for c, b in sections.items() if collectors is None or c in collectors)
+        lines = self._exporter_lines(self.collected, collectors)
+        lines.extend(SELF_METRICS.lines(collectors))
+        return body + ("\n".join(lines) + "\n").encode("utf-8")
+
+    def probe(self, name, collectors=None, timeout=None):
+        """
+        Metrics of one target, or None if no such target (or no collection yet).
+
+        A probed target is fetched now, within `timeout` seconds (capped at
+        the collection deadline); concurrent probes of the same target and
+        collectors share one fetch. Other targets are rendered from the cache.
+        """
+        target = self.by_name.get(name)
+        if target is None:
+            return None
+        if name in self.probed:
+            key = ("probe", name, tuple(sorted(collectors)) if collectors else None)
+            return self.flight.do(key, lambda: self._probe_live(target, collectors, timeout))
+
+        if self._current() is None:
+            return None
+        with self._lock:
+            results = {k: v for k, v in self._results.items() if k[0] == name}
+        body = "".join(generate_sections([target], results, collectors, observe=False).values())
+        lines = self._exporter_lines([target], collectors)
+        return (body + "\n".join(lines) + "\n").encode("utf-8")
+
+    def _probe_live(self, target, collectors, timeout):
+        deadline = self.deadline if timeout is None else min(self.deadline, timeout)
+        start = time.monotonic()
+        pairs = [(target, e) for e in ENDPOINTS if collectors is None or e in collectors]
+        results = fetch_all([target], self.executor, self.limits, pairs,
+                            deadline=deadline, budgets={target["name"]: min(deadline, self.budgets[target["name"]])})
+        duration = time.monotonic() - start
+        body = "".join(generate_sections([target], results, collectors, observe=False).values())
+        host = escape_label_value(target["name"])
+        success = all(error is None or endpoint_unavailable(error)
+                      for _, error in results.values())
+        lines = [
+            "# HELP truenas_exporter_probe_success 1 if every endpoint of the probe that "
+            "this TrueNAS version provides was fetched",
+            "# TYPE truenas_exporter_probe_success gauge",
+            f'truenas_exporter_probe_success{{host="{host}"}} {1 if success else 0}',
+            "# HELP truenas_exporter_probe_duration_seconds Duration of the probe",
+            "# TYPE truenas_exporter_probe_duration_seconds gauge",
+            f'truenas_exporter_probe_duration_seconds{{host="{host}"}} {duration:.3f}',
+        ]
+        return (body + "\n".join(lines) + "\n").encode("utf-8")
+
+
+class PooledHTTPServer(ThreadingHTTPServer):
+    """
+    ThreadingHTTPServer that handles requests on a fixed pool of threads.
+
+    Accepted connections wait in a queue of at most `backlog` entries; when
+    it is full the connection is answered with 503 and closed, so a stuck
+    backend cannot pile up sockets and memory without limit.
+    """
+
+    BUSY_RESPONSE = (b"HTTP/1.1 503 Service Unavailable\r\n"
+                     b"Content-Type: text/plain; charset=utf-8\r\n"
+                     b"Content-Length: 12\r\n"
+                     b"Retry-After: 1\r\n"
+                     b"Connection: close\r\n"
+                     b"\r\n"
+                     b"server busy\n")
+
+    def __init__(self, server_address, handler_class, workers=DEFAULT_HTTP_WORKERS,
+                 backlog=DEFAULT_HTTP_QUEUE):
+        super().__init__(server_address, handler_class)
+        self.requests = queue.Queue(maxsize=backlog)
+        self.workers = [
+            threading.Thread(target=self._work, name=f"http_{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def _work(self):
+        while True:
+            item = self.requests.get()
+            if item is None:
+                return
+            self.process_request_thread(*item)
+
+    def process_request(self, request, client_address):
+        try:
+            self.requests.put_nowait((request, client_address))
+        except queue.Full:
+            logger.warning("HTTP queue full, rejecting request from %s", client_address[0])
+            try:
+                request.sendall(self.BUSY_RESPONSE)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        for _ in self.workers:
+            try:
+                self.requests.put_nowait(None)
+            except queue.Full:
+                break
 
 
 class MetricsHandler(BaseHTTPRequestHandler):
     """HTTP request handler for Prometheus metrics endpoint."""
 
-    def __init__(self, targets, *args, **kwargs):
-        self.targets = targets
+    def __init__(self, collector, *args, **kwargs):
+        self.collector = collector
+        self.targets = collector.targets
         super().__init__(*args, **kwargs)
 
+    def _send_text(self, status, body):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
     def do_GET(self):
-        if self.path == "/metrics":
-            metrics = generate_metrics(self.targets)
-            self.send_response(200)
-            self.send_header("Content-Type", "text/plain; charset=utf-8")
-            self.end_headers()
-            self.wfile.write(metrics.encode("utf-8"))
-        elif self.path in ("/health", "/healthz"):
+        url = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        collectors = query.get("collect[]")
+        unknown = sorted(set(collectors or ()) - set(COLLECTORS))
+        if url.path in ("/metrics", "/probe") and unknown:
+            self._send_text(400, f"unknown collector(s): {', '.join(unknown)}\n")
+            return
+
+        if url.path == "/metrics":
+            body = self.collector.exposition(collectors)
+            if body is None:
+                # First collection failed
+                self._send_text(503, "no collection available\n")
+                return
+            self._send_text(200, body)
+        elif url.path == "/probe":
+            name = (query.get("target") or [None])[0]
+            if not name:
+                self._send_text(400, "target parameter is missing\n")
+                return
+            if name not in self.collector.by_name:
+                self._send_text(400, f"unknown target: {name}\n")
+                return
+            timeout = None
+            header = self.headers.get("X-Prometheus-Scrape-Timeout-Seconds")
+            if header:
+                try:
+                    # Leave room to render and send before Prometheus gives up
+                    timeout = max(0.5, float(header) - 0.5)
+                except ValueError:
+                    pass
+            body = self.collector.probe(name, collectors, timeout)
+            if body is None:
+                self._send_text(503, "no collection available\n")
+                return
+            self._send_text(200, body)
+        elif url.path in ("/health", "/healthz"):
             self.send_response(200)
             self.send_header("Content-Type", "application/json")
             self.end_headers()
             self.wfile.write(b'{"status": "ok"}')
-        elif self.path == "/":
+        elif url.path == "/":
             # Landing page with links
             html = f"""<!DOCTYPE html>
 <html>
@@ -678,6 +1925,7 @@ class MetricsHandler(BaseHTTPRequestHandler):
 <h1>TrueNAS Exporter v{__version__}</h1>
 <p><a href="/metrics">Metrics</a></p>
 <p><a href="/health">Health Check</a></p>
+<p>Probe one host: /probe?target=&lt;name&gt;</p>
 <p>Monitoring {len(self.targets)} TrueNAS host(s)</p>
 </body>
 </html>"""
@@ -703,6 +1951,7 @@ Examples:
   %(prog)s --config /etc/truenas-exporter/config.yaml
   %(prog)s --config config.yaml --port 9814
   %(prog)s --config config.yaml --debug
+  %(prog)s --config config.yaml --interval 60
 
 Repository: https://github.com/alexlmiller/truenas-grafana
         """,
@@ -718,6 +1967,12 @@ Repository: https://github.com/alexlmiller/truenas-grafana
         default=None,
         help="Port to listen on (overrides config file)",
     )
+    parser.add_argument(
+        "--interval", "-i",
+        type=int,
+        default=None,
+        help="Default seconds between endpoint refreshes (overrides config file)",
+    )
     parser.add_argument(
         "--debug", "-d",
         action="store_true",
@@ -746,10 +2001,41 @@ Repository: https://github.com/alexlmiller/truenas-grafana
     # Determine port
     port = args.port or config.get("listen_port", 9814)
 
+    # Start background collection
+    interval = args.interval or config.get("collect_interval")
+    refresh = {
+        endpoint: int(config.get(f"{endpoint}_refresh_interval", interval or default))
+        for endpoint, default in DEFAULT_REFRESH_INTERVALS.items()
+    }
+    mode = config.get("mode", "poll")
+    subscribers = {
+        t["name"]: Subscriber(t, refresh)
+        for t in targets if t.get("mode", mode) == "subscribe"
+    }
+    probed = {t["name"] for t in targets if t.get("mode", mode) == "probe"}
+    collector = Collector(
+        targets,
+        refresh,
+        max_workers=int(config.get("max_workers", DEFAULT_MAX_WORKERS)),
+        per_target=int(config.get("max_concurrency_per_target",
+                                  DEFAULT_MAX_CONCURRENCY_PER_TARGET)),
+        subscribers=subscribers,
+        deadline=float(config.get("collect_deadline", DEFAULT_COLLECT_DEADLINE)),
+        budget=float(config.get("target_budget", DEFAULT_TARGET_BUDGET)),
+        probed=probed,
+    )
+    collector.start()
+
     # Start server
-    server = HTTPServer(("0.0.0.0", port),
-                        lambda *a, **kw: MetricsHandler(targets, *a, **kw))
+    server = PooledHTTPServer(("0.0.0.0", port),
+                              lambda *a, **kw: MetricsHandler(collector, *a, **kw),
+                              workers=int(config.get("http_workers", DEFAULT_HTTP_WORKERS)),
+                              backlog=int(config.get("http_queue", DEFAULT_HTTP_QUEUE)))
     logger.info("TrueNAS Exporter v%s listening on port %s", __version__, port)
+    logger.info("Refreshing in the background: %s",
+                ", ".join(f"{e} every {s}s" for e, s in refresh.items()))
+    if subscribers:
+        logger.info("Subscribing to %s over WebSocket", ", ".join(subscribers))
     logger.info("Monitoring %s TrueNAS host(s): %s", len(targets), ", ".join(t["name"] for t in targets))
     logger.info("Metrics available at http://localhost:%s/metrics", port)
 